@@ -0,0 +1 @@
+"""Performance benchmarks for tap-klaviyo (run with `python -m benchmarks.<name>`)."""
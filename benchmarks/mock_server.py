@@ -0,0 +1,476 @@
+"""Local stand-in for the Klaviyo API endpoints used by the tap.
+
+Records are generated on the fly from their index, so large accounts cost no
+memory. Profiles and events honour the `created`/`updated`/`datetime` bounds of
+their `filter` (greater-than, less-or-equal, ...), so time-sliced and incremental
+syncs read only the records in range. Latency, page sizes and injected 429
+responses are configurable:
+
+    python -m benchmarks.mock_server [--port 8765] [--profiles 5000] [--latency 0.05] [--throttle-rate 0.02]
+
+Point the tap at it by setting `KlaviyoStream.url_base` to `<url>/api`
+(see `benchmarks.sync`).
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+BASE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+# seconds between consecutive events
+EVENT_INTERVAL = 30
+METRIC_NAMES = ("Opened Email", "Clicked Email", "Bounced Email", "Received Email", "Placed Order")
+CHANNELS = ("email", "sms")
+
+
+@dataclass
+class MockSettings:
+    profiles: int = 2000
+    events: int = 5000
+    lists: int = 5
+    list_members: int = 200
+    campaigns: int = 20
+    report_combinations: int = 20
+    # (default, maximum) page size per collection; Klaviyo ignores page[size] on some
+    page_sizes: Dict[str, Tuple[int, int]] = field(
+        default_factory=lambda: {
+            "profiles": (20, 100),
+            "list_members": (20, 100),
+            "events": (200, 200),
+            "lists": (10, 10),
+            "campaigns": (10, 10),
+            "metrics": (200, 200),
+        }
+    )
+    latency: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: int = 1
+    seed: int = 0
+
+
+def _iso(value: datetime) -> str:
+    return value.isoformat().replace("+00:00", "Z")
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+TIME_FILTER = re.compile(r"(greater-than|greater-or-equal|less-than|less-or-equal)\((\w+),([^,)]+)\)")
+COMPARISONS = {
+    "greater-than": lambda value, bound: value > bound,
+    "greater-or-equal": lambda value, bound: value >= bound,
+    "less-than": lambda value, bound: value < bound,
+    "less-or-equal": lambda value, bound: value <= bound,
+}
+
+
+def time_bounds(filter_expression: str) -> list:
+    """Return the (comparison, attribute, datetime) bounds of a filter expression."""
+    return [
+        (COMPARISONS[operator], attribute, _parse_time(value))
+        for operator, attribute, value in TIME_FILTER.findall(filter_expression)
+    ]
+
+
+def in_bounds(value: datetime, attribute: str, bounds: list) -> bool:
+    return all(compare(value, bound) for compare, name, bound in bounds if name == attribute)
+
+
+def _random(*key) -> random.Random:
+    # str seeds are hashed deterministically, unlike hash() of a tuple
+    return random.Random(repr(key))
+
+
+def _ulid(prefix: str, index: int) -> str:
+    """A 26 character id shaped like Klaviyo's (a bare "P1" would parse as a duration)."""
+    return f"01HB{prefix}{index:0{22 - len(prefix)}d}"
+
+
+def metric(index: int) -> dict:
+    return {
+        "type": "metric",
+        "id": f"M{index}",
+        "attributes": {
+            "name": METRIC_NAMES[index],
+            "created": _iso(BASE_TIME),
+            "updated": _iso(BASE_TIME),
+            "integration": {"name": "Klaviyo", "category": "Internal"},
+        },
+    }
+
+
+def profile(index: int) -> dict:
+    rng = _random("profile", index)
+    created = BASE_TIME + timedelta(seconds=index * 60)
+    return {
+        "type": "profile",
+        "id": _ulid("P", index),
+        "attributes": {
+            "email": f"user{index}@example.com",
+            "phone_number": None,
+            "first_name": rng.choice(("Ada", "Grace", "Alan", "Edsger")),
+            "last_name": rng.choice(("Lovelace", "Hopper", "Turing", "Dijkstra")),
+            "organization": None,
+            "title": None,
+            "created": _iso(created),
+            "updated": _iso(created + timedelta(seconds=rng.randrange(86400))),
+            "last_event_date": _iso(created + timedelta(seconds=rng.randrange(86400))),
+            "location": {"city": "London", "country": "UK", "zip": str(rng.randrange(10000))},
+            "properties": {"source": "benchmark", "score": rng.random()},
+        },
+        "links": {"self": f"/api/profiles/{_ulid('P', index)}/"},
+    }
+
+
+def event(index: int) -> dict:
+    rng = _random("event", index)
+    metric_index = index % len(METRIC_NAMES)
+    occurred = BASE_TIME + timedelta(seconds=index * EVENT_INTERVAL)
+    return {
+        "type": "event",
+        "id": _ulid("E", index),
+        "attributes": {
+            "timestamp": int(occurred.timestamp()),
+            "event_properties": {"$value": round(rng.random() * 100, 2), "Campaign Name": "Welcome"},
+            "datetime": _iso(occurred),
+            "uuid": f"uuid-{index}",
+        },
+        "relationships": {
+            "profile": {"data": {"type": "profile", "id": _ulid("P", rng.randrange(1000))}},
+            "metric": {"data": {"type": "metric", "id": f"M{metric_index}"}},
+        },
+        "links": {"self": f"/api/events/{_ulid('E', index)}/"},
+    }
+
+
+def email_list(index: int) -> dict:
+    return {
+        "type": "list",
+        "id": f"L{index}",
+        "attributes": {"name": f"List {index}", "created": _iso(BASE_TIME), "updated": _iso(BASE_TIME)},
+    }
+
+
+def list_member(list_index: int, index: int) -> dict:
+    member = profile(list_index * 100000 + index)
+    member["attributes"]["joined_group_at"] = member["attributes"]["created"]
+    return member
+
+
+def campaign_message(campaign_index: int) -> dict:
+    return {
+        "type": "campaign-message",
+        "id": f"CM{campaign_index}",
+        "attributes": {"label": f"Campaign {campaign_index}", "channel": CHANNELS[campaign_index % 2]},
+        "relationships": {"template": {"data": {"type": "template", "id": f"T{campaign_index}"}}},
+    }
+
+
+def campaign(index: int) -> dict:
+    return {
+        "type": "campaign",
+        "id": f"C{index}",
+        "attributes": {
+            "name": f"Campaign {index}",
+            "status": "Sent",
+            "created_at": _iso(BASE_TIME),
+            "updated_at": _iso(BASE_TIME + timedelta(hours=index)),
+        },
+        "relationships": {
+            "campaign-messages": {"data": [{"type": "campaign-message", "id": f"CM{index}"}]}
+        },
+    }
+
+
+class MockKlaviyoServer:
+    """Threaded HTTP server answering like the Klaviyo API, with request counters."""
+
+    def __init__(self, settings: Optional[MockSettings] = None, host: str = "127.0.0.1", port: int = 0):
+        self.settings = settings or MockSettings()
+        self.requests: Counter = Counter()
+        self.bytes_sent: Counter = Counter()
+        self.throttled: Counter = Counter()
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.settings.seed)
+        # profile timestamps by attribute, for sort= and time filters
+        self._profile_values: Dict[str, list] = {}
+        self._profile_indexes: Dict[str, int] = {}
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockKlaviyoServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": sum(self.requests.values()),
+                "bytes": sum(self.bytes_sent.values()),
+                "throttled": sum(self.throttled.values()),
+            }
+
+    # routing
+
+    def _page(self, name: str, total: int, make, query: dict, path: str) -> dict:
+        default, maximum = self.settings.page_sizes[name]
+        size = min(int(query.get("page[size]", default)), maximum)
+        offset = int(query.get("page[cursor]", 0))
+        data = [make(i) for i in range(offset, min(offset + size, total))]
+        next_link = None
+        if offset + size < total:
+            next_query = dict(query, **{"page[cursor]": str(offset + size)})
+            next_link = f"{self.url}{path}?{urlencode(next_query)}"
+        return {"data": data, "links": {"self": f"{self.url}{path}", "next": next_link}}
+
+    def _profile_times(self, attribute: str) -> list:
+        """Return the `attribute` timestamp of every profile, by index."""
+        with self._lock:
+            if attribute not in self._profile_values:
+                self._profile_values[attribute] = [
+                    _parse_time(profile(i)["attributes"][attribute]) for i in range(self.settings.profiles)
+                ]
+            return self._profile_values[attribute]
+
+    def _profiles(self, query: dict, path: str) -> dict:
+        key = query.get("sort")
+        bounds = time_bounds(query.get("filter", ""))
+        order = list(range(self.settings.profiles))
+        if key in ("created", "updated"):
+            times = self._profile_times(key)
+            order.sort(key=lambda i: times[i])
+        for attribute in {name for _, name, _ in bounds}:
+            times = self._profile_times(attribute)
+            order = [i for i in order if in_bounds(times[i], attribute, bounds)]
+        return self._page("profiles", len(order), lambda i: profile(order[i]), query, path)
+
+    def _events(self, query: dict, path: str) -> dict:
+        match = re.search(r"equals\(metric_id,'M(\d+)'\)", query.get("filter", ""))
+        # events of one metric are every len(METRIC_NAMES)-th event
+        first, step = (int(match.group(1)), len(METRIC_NAMES)) if match else (0, 1)
+        bounds = time_bounds(query.get("filter", ""))
+        indexes = [
+            i
+            for i in range(first, self.settings.events, step)
+            if in_bounds(BASE_TIME + timedelta(seconds=i * EVENT_INTERVAL), "datetime", bounds)
+        ]
+        body = self._page("events", len(indexes), lambda i: event(indexes[i]), query, path)
+        include = query.get("include", "").split(",")
+        if "profile" in include or "metric" in include:
+            body["included"] = self._event_includes(body["data"], include, query)
+        return body
+
+    def _event_includes(self, events: list, include: list, query: dict) -> list:
+        if not self._profile_indexes:
+            # events relate to the first 1000 profiles
+            self._profile_indexes.update({_ulid("P", i): i for i in range(1000)})
+        resources = {}
+        for item in events:
+            for name, make in (("profile", lambda id: profile(self._profile_indexes[id])),
+                               ("metric", lambda id: metric(int(id[1:])))):
+                related = item["relationships"][name]["data"]
+                if name in include and related["id"] not in resources:
+                    resource = make(related["id"])
+                    fields = query.get(f"fields[{name}]")
+                    if fields:
+                        names = fields.split(",")
+                        resource["attributes"] = {
+                            key: value for key, value in resource["attributes"].items() if key in names
+                        }
+                    resources[related["id"]] = resource
+        return list(resources.values())
+
+    def _campaigns(self, query: dict, path: str) -> dict:
+        channel = CHANNELS[1] if "'sms'" in query.get("filter", "") else CHANNELS[0]
+        indexes = [i for i in range(self.settings.campaigns) if CHANNELS[i % 2] == channel]
+        body = self._page("campaigns", len(indexes), lambda i: campaign(indexes[i]), query, path)
+        if "campaign-messages" in query.get("include", ""):
+            body["included"] = [campaign_message(int(c["id"][1:])) for c in body["data"]]
+        return body
+
+    def _metric_aggregates(self, payload: dict) -> dict:
+        attributes = payload["data"]["attributes"]
+        bounds = [
+            _parse_time(value)
+            for value in re.findall(r"datetime,([^)]+)\)", ",".join(attributes.get("filter", [])))
+        ]
+        start, end = (bounds + [BASE_TIME, BASE_TIME + timedelta(days=7)])[:2]
+        days = max(1, min(366, (end - start).days))
+        dates = [_iso(start + timedelta(days=i)) for i in range(days)]
+        rng = _random("aggregates", attributes.get("metric_id"), dates[0])
+        data = [
+            {
+                "dimensions": [f"{dimension} {i}" for dimension in attributes.get("by", [])],
+                "measurements": {
+                    measurement: [rng.randrange(1000) for _ in dates]
+                    for measurement in attributes.get("measurements", ["count"])
+                },
+            }
+            for i in range(self.settings.report_combinations)
+        ]
+        return {
+            "data": {"type": "metric-aggregate", "attributes": {"dates": dates, "data": data}},
+            "links": {"next": None},
+        }
+
+    def route(self, method: str, path: str, query: dict, payload: Optional[dict]) -> Tuple[int, dict]:
+        settings = self.settings
+        if path == "/oauth/token":
+            return 200, {
+                "access_token": f"token-{time.time()}",
+                "refresh_token": "refresh-benchmark",
+                "expires_in": 3600,
+                "token_type": "Bearer",
+            }
+        if path == "/api/profiles":
+            return 200, self._profiles(query, path)
+        if path == "/api/events":
+            return 200, self._events(query, path)
+        if path == "/api/metrics":
+            return 200, self._page("metrics", len(METRIC_NAMES), metric, query, path)
+        if path == "/api/lists":
+            return 200, self._page("lists", settings.lists, email_list, query, path)
+        match = re.fullmatch(r"/api/lists/L(\d+)/profiles", path)
+        if match:
+            list_index = int(match.group(1))
+            return 200, self._page(
+                "list_members", settings.list_members, lambda i: list_member(list_index, i), query, path
+            )
+        if path == "/api/campaigns":
+            return 200, self._campaigns(query, path)
+        match = re.fullmatch(r"/api/campaigns/C(\d+)/campaign-messages", path)
+        if match:
+            return 200, {"data": [campaign_message(int(match.group(1)))], "links": {"next": None}}
+        if path == "/api/metric-aggregates" and method == "POST":
+            return 200, self._metric_aggregates(payload or {})
+        if path.startswith("/api/"):
+            return 200, {"data": [], "links": {"next": None}}
+        return 404, {"errors": [{"status": 404, "code": "not_found", "detail": path}]}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _respond(self, method: str) -> None:
+                parsed = urlparse(self.path)
+                query = dict(parse_qsl(parsed.query, keep_blank_values=True))
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                payload = None
+                if raw and "json" in (self.headers.get("Content-Type") or ""):
+                    payload = json.loads(raw)
+
+                if server.settings.latency:
+                    time.sleep(server.settings.latency)
+                headers = {"Content-Type": "application/json"}
+                with server._lock:
+                    throttle = (
+                        parsed.path.startswith("/api/")
+                        and server._rng.random() < server.settings.throttle_rate
+                    )
+                if throttle:
+                    status = 429
+                    body = {"errors": [{"status": 429, "code": "throttled", "detail": "Request was throttled."}]}
+                    headers["Retry-After"] = str(server.settings.retry_after)
+                else:
+                    status, body = server.route(method, parsed.path, query, payload)
+                encoded = json.dumps(body).encode("utf-8")
+                with server._lock:
+                    server.requests[parsed.path] += 1
+                    server.bytes_sent[parsed.path] += len(encoded)
+                    if throttle:
+                        server.throttled[parsed.path] += 1
+
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def do_GET(self):
+                self._respond("GET")
+
+            def do_POST(self):
+                self._respond("POST")
+
+        return Handler
+
+
+def add_settings_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = MockSettings()
+    for name in ("profiles", "events", "lists", "list_members", "campaigns", "report_combinations"):
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=getattr(defaults, name))
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="seconds added to each response")
+    parser.add_argument("--throttle-rate", type=float, default=defaults.throttle_rate, help="fraction of API requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=defaults.retry_after)
+    parser.add_argument("--page-size", action="append", default=[], metavar="NAME=DEFAULT[:MAX]",
+                        help="override a collection's page size, e.g. profiles=50:100")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def settings_from_arguments(args: argparse.Namespace) -> MockSettings:
+    settings = MockSettings(
+        profiles=args.profiles,
+        events=args.events,
+        lists=args.lists,
+        list_members=args.list_members,
+        campaigns=args.campaigns,
+        report_combinations=args.report_combinations,
+        latency=args.latency,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    for override in args.page_size:
+        name, sizes = override.split("=")
+        default, _, maximum = sizes.partition(":")
+        settings.page_sizes[name] = (int(default), int(maximum or default))
+    return settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockKlaviyoServer(settings_from_arguments(args), host=args.host, port=args.port)
+    print(f"Mock Klaviyo API listening on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Records/sec of record post-processing on large events and contacts pages.
+
+Compares the generic per-key post_process loop this tap used to run with the
+compiled RecordTransformer:
+
+    python -m benchmarks.post_process [--records 20000] [--repeat 3]
+"""
+
+import argparse
+import copy
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from pendulum import parse
+
+from tap_klaviyo.transform import RecordTransformer
+
+EVENTS_SCHEMA = {
+    "properties": {
+        "type": {"type": ["string", "null"]},
+        "id": {"type": ["string", "null"]},
+        "relationships": {"type": ["object", "null"]},
+        "links": {"type": ["object", "null"]},
+        "timestamp": {"type": ["integer", "null"]},
+        "event_properties": {"type": ["object", "string", "null"]},
+        "datetime": {"type": ["string", "null"], "format": "date-time"},
+        "uuid": {"type": ["string", "null"]},
+    }
+}
+
+CONTACTS_SCHEMA = {
+    "properties": {
+        "type": {"type": ["string", "null"]},
+        "id": {"type": ["string", "null"]},
+        "links": {"type": ["object", "null"]},
+        "email": {"type": ["string", "null"]},
+        "phone_number": {"type": ["string", "null"]},
+        "first_name": {"type": ["string", "null"]},
+        "last_name": {"type": ["string", "null"]},
+        "organization": {"type": ["string", "null"]},
+        "title": {"type": ["string", "null"]},
+        "image": {"type": ["string", "null"]},
+        "created": {"type": ["string", "null"], "format": "date-time"},
+        "updated": {"type": ["string", "null"], "format": "date-time"},
+        "last_event_date": {"type": ["string", "null"], "format": "date-time"},
+        "location": {"type": ["object", "null"]},
+        "properties": {"type": ["object", "string", "null"]},
+    }
+}
+
+
+def _timestamp(rng, base, spread_seconds):
+    value = base + timedelta(seconds=rng.randrange(spread_seconds))
+    return value.isoformat()
+
+
+def make_events(count, seed=0):
+    rng = random.Random(seed)
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "type": "event",
+            "id": f"evt{i}",
+            "attributes": {
+                "timestamp": 1704067200 + i,
+                "event_properties": {"$value": rng.random() * 100, "Campaign Name": "Welcome"},
+                "datetime": _timestamp(rng, base, 86400),
+                "uuid": f"uuid-{i}",
+            },
+            "relationships": {
+                "profile": {"data": {"type": "profile", "id": f"p{rng.randrange(1000)}"}},
+                "metric": {"data": {"type": "metric", "id": "m1"}},
+            },
+            "links": {"self": f"https://a.klaviyo.com/api/events/evt{i}/"},
+        }
+        for i in range(count)
+    ]
+
+
+def make_contacts(count, seed=0):
+    rng = random.Random(seed)
+    base = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "type": "profile",
+            "id": f"p{i}",
+            "attributes": {
+                "email": f"user{i}@example.com",
+                "phone_number": None,
+                "first_name": "Ada",
+                "last_name": "Lovelace",
+                "organization": None,
+                "title": None,
+                "image": None,
+                "created": _timestamp(rng, base, 365 * 86400),
+                "updated": _timestamp(rng, base, 365 * 86400),
+                "last_event_date": _timestamp(rng, base, 365 * 86400),
+                "location": {"city": "London", "country": "UK"},
+                "properties": {"source": "benchmark"},
+            },
+            "links": {"self": f"https://a.klaviyo.com/api/profiles/p{i}/"},
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_post_process(schema, row):
+    """The generic post_process loop the transformer replaces."""
+    for key, value in row.get("attributes", {}).items():
+        row[key] = value
+    row.pop("attributes", None)
+    for key, value in row.items():
+        if schema.get("properties", {}).get(key, {}).get("format") == "date-time" and value is not None:
+            row[key] = parse(value).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    return row
+
+
+def _records_per_second(records, transform, repeat):
+    best = None
+    for _ in range(repeat):
+        rows = copy.deepcopy(records)
+        start = time.perf_counter()
+        for row in rows:
+            transform(row)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(records) / best
+
+
+def run(record_count, repeat):
+    results = []
+    for name, schema, records in [
+        ("events", EVENTS_SCHEMA, make_events(record_count)),
+        ("contacts", CONTACTS_SCHEMA, make_contacts(record_count)),
+    ]:
+        transformer = RecordTransformer(schema)
+        expected = [legacy_post_process(schema, row) for row in copy.deepcopy(records)]
+        actual = [transformer(row) for row in copy.deepcopy(records)]
+        assert actual == expected, f"transformer output differs for {name}"
+
+        before = _records_per_second(records, lambda row: legacy_post_process(schema, row), repeat)
+        after = _records_per_second(records, transformer, repeat)
+        results.append((name, before, after))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'stream':<10} {'before rec/s':>14} {'after rec/s':>14} {'speedup':>8}")
+    for name, before, after in run(args.records, args.repeat):
+        print(f"{name:<10} {before:>14,.0f} {after:>14,.0f} {after / before:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""End-to-end sync throughput against the local mock Klaviyo API.
+
+Each stream is discovered and synced in its own process, so the peak RSS is the
+stream's own. Singer output is counted and discarded:
+
+    python -m benchmarks.sync [--streams contacts,events,list_members] [--profiles 5000]
+        [--latency 0.05] [--throttle-rate 0.02] [--config extra_config.json] [--oauth]
+"""
+
+import argparse
+import io
+import json
+import logging
+import multiprocessing
+import resource
+import sys
+import time
+
+from benchmarks.mock_server import MockKlaviyoServer, add_settings_arguments, settings_from_arguments
+
+DEFAULT_STREAMS = (
+    "contacts",
+    "events",
+    "events_opened_email",
+    "lists",
+    "list_members",
+    "campaigns",
+    "campaign_messages",
+    "emails_opened_per_day",
+)
+
+
+class CountingOutput(io.TextIOBase):
+    """Stand-in for stdout that counts Singer messages instead of writing them."""
+
+    def __init__(self):
+        self.records = 0
+        self.states = 0
+        self.bytes = 0
+
+    def write(self, text: str) -> int:
+        self.bytes += len(text)
+        for line in text.splitlines():
+            head = line[:40]
+            if '"RECORD"' in head:
+                self.records += 1
+            elif '"STATE"' in head:
+                self.states += 1
+        return len(text)
+
+
+def _select(catalog: dict, stream_name: str) -> dict:
+    found = False
+    for entry in catalog["streams"]:
+        selected = entry["tap_stream_id"] == stream_name
+        found = found or selected
+        for metadata in entry.get("metadata", []):
+            if not metadata.get("breadcrumb"):
+                metadata["metadata"]["selected"] = selected
+    if not found:
+        raise ValueError(f"Stream {stream_name} was not discovered")
+    return catalog
+
+
+def _run_stream(api_url: str, config: dict, stream_name: str, connection) -> None:
+    """Discover, then sync one stream; runs in a child process."""
+    from tap_klaviyo.client import KlaviyoStream
+    from tap_klaviyo.tap import TapKlaviyo
+
+    KlaviyoStream.url_base = f"{api_url}/api"
+    try:
+        catalog = _select(TapKlaviyo(config=dict(config)).catalog_dict, stream_name)
+        tap = TapKlaviyo(config=dict(config), catalog=catalog)
+        connection.send("discovered")
+        connection.recv()
+
+        output = CountingOutput()
+        stdout, sys.stdout = sys.stdout, output
+        start = time.perf_counter()
+        try:
+            tap.sync_all()
+        finally:
+            sys.stdout = stdout
+        connection.send(
+            {
+                "seconds": time.perf_counter() - start,
+                "records": output.records,
+                "states": output.states,
+                "output_bytes": output.bytes,
+                # kilobytes on Linux
+                "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            }
+        )
+    except Exception as e:
+        connection.send({"error": f"{type(e).__name__}: {e}"})
+
+
+def benchmark_stream(server: MockKlaviyoServer, config: dict, stream_name: str) -> dict:
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.get_context("fork").Process(
+        target=_run_stream, args=(server.url, config, stream_name, child)
+    )
+    process.start()
+    message = parent.recv()
+    if message != "discovered":
+        process.join()
+        return message
+    before = server.stats()
+    parent.send("sync")
+    result = parent.recv()
+    process.join()
+    after = server.stats()
+    result.update({key: after[key] - before[key] for key in after})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", default=",".join(DEFAULT_STREAMS))
+    parser.add_argument("--config", help="JSON file with extra tap settings, e.g. performance options")
+    parser.add_argument("--oauth", action="store_true", help="authenticate with a refresh token instead of an API key")
+    parser.add_argument("--verbose", action="store_true", help="keep the tap's log output")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+
+    config = {"start_date": "2020-01-01T00:00:00Z"}
+    if args.oauth:
+        config.update(client_id="benchmark", client_secret="benchmark", refresh_token="refresh-benchmark")
+    else:
+        config["api_private_key"] = "pk_benchmark"
+    if args.config:
+        with open(args.config) as config_file:
+            config.update(json.load(config_file))
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    server = MockKlaviyoServer(settings_from_arguments(args)).start()
+    results = {}
+    try:
+        for stream_name in args.streams.split(","):
+            results[stream_name] = benchmark_stream(server, config, stream_name.strip())
+    finally:
+        server.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(
+        f"{'stream':<24} {'records':>9} {'seconds':>8} {'rec/s':>9} {'requests':>9} "
+        f"{'429s':>5} {'MB in':>7} {'peak RSS MB':>12}"
+    )
+    for stream_name, result in results.items():
+        if "error" in result:
+            print(f"{stream_name:<24} {result['error']}")
+            continue
+        rate = result["records"] / result["seconds"] if result["seconds"] else 0
+        print(
+            f"{stream_name:<24} {result['records']:>9,} {result['seconds']:>8.2f} {rate:>9,.0f} "
+            f"{result['requests']:>9,} {result['throttled']:>5} {result['bytes'] / 2**20:>7.2f} "
+            f"{result['peak_rss_mb']:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
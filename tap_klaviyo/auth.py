@@ -1,19 +1,34 @@
 """Klaviyo Authentication."""
 
 
-import json
+import threading
+import time
 from datetime import datetime
 from typing import Optional
+from urllib.parse import urljoin
 
 import backoff
-import requests
 from hotglue_singer_sdk.authenticators import OAuthAuthenticator, SingletonMeta
 from hotglue_singer_sdk.streams import Stream as RESTStreamBase
 from hotglue_singer_sdk.tap_base import InvalidCredentialsError
 
+from tap_klaviyo.files import write_json_atomic
+from tap_klaviyo.session import get_session
+
+# seconds before expiry at which a token is refreshed in the background
+REFRESH_AHEAD = 600
+# seconds before expiry at which requests wait for a new token
+MIN_VALIDITY = 120
+# seconds between background refresh attempts, if one fails
+BACKGROUND_RETRY_INTERVAL = 60
+
 class KlaviyoAuthenticator(OAuthAuthenticator, metaclass=SingletonMeta):
     """Authenticator class for Klaviyo."""
 
+    # SingletonMeta does not lock, so threads building streams at once could each
+    # create an instance and spend the same rotating refresh token
+    _instance_lock = threading.Lock()
+
     def __init__(
         self,
         stream: RESTStreamBase,
@@ -26,16 +41,25 @@ class KlaviyoAuthenticator(OAuthAuthenticator, metaclass=SingletonMeta):
         )
         self._config_file = config_file
         self._tap = stream._tap
+        self._refresh_lock = threading.Lock()
+        # incremented by every finished refresh, so waiting callers reuse its result
+        self._refresh_count = 0
+        self._refresh_error: Optional[Exception] = None
+        self._background_lock = threading.Lock()
+        self._background_refresh: Optional[threading.Thread] = None
+        self._background_started = float("-inf")
 
     @property
     def auth_headers(self) -> dict:
         if not self.is_token_valid():
-            self.update_access_token()
+            self.refresh_access_token()
+        elif not self.is_token_valid(REFRESH_AHEAD):
+            self._refresh_in_background()
         result = {}
         result["Authorization"] = f"Bearer {self._tap._config.get('access_token')}"
         return result
 
-    def is_token_valid(self) -> bool:
+    def is_token_valid(self, min_validity: int = MIN_VALIDITY) -> bool:
         access_token = self._tap._config.get("access_token")
         now = round(datetime.utcnow().timestamp())
         expires_in = self._tap._config.get("expires_in")
@@ -45,7 +69,50 @@ class KlaviyoAuthenticator(OAuthAuthenticator, metaclass=SingletonMeta):
             return False
         if not expires_in:
             return False
-        return not ((expires_in - now) < 120)
+        return not ((expires_in - now) < min_validity)
+
+    def refresh_access_token(self, min_validity: int = MIN_VALIDITY) -> None:
+        """Refresh the access token, once for all the threads asking at the same time.
+
+        Callers arriving while a refresh is in flight wait for it and get its
+        result, or its error, instead of sending a refresh of their own.
+        """
+        seen = self._refresh_count
+        with self._refresh_lock:
+            if self._refresh_count == seen:
+                if self.is_token_valid(min_validity):
+                    return
+                try:
+                    self.update_access_token()
+                    self._refresh_error = None
+                except Exception as e:
+                    self._refresh_error = e
+                finally:
+                    self._refresh_count += 1
+            if self._refresh_error is not None:
+                raise self._refresh_error
+
+    def _refresh_in_background(self) -> None:
+        """Start refreshing a token that expires soon, unless a refresh is already running."""
+        with self._background_lock:
+            if self._background_refresh is not None and self._background_refresh.is_alive():
+                return
+            if time.monotonic() - self._background_started < BACKGROUND_RETRY_INTERVAL:
+                return
+            self._background_started = time.monotonic()
+            # not a daemon: the interpreter waits for it at exit, so a rotated
+            # refresh token is always written to the config file
+            self._background_refresh = threading.Thread(
+                target=self._refresh_ahead, name="klaviyo-token-refresh", daemon=False
+            )
+            self._background_refresh.start()
+
+    def _refresh_ahead(self) -> None:
+        try:
+            self.refresh_access_token(REFRESH_AHEAD)
+        except Exception as e:
+            # requests refresh in the foreground once the token is about to expire
+            self.logger.warning(f"Background OAuth token refresh failed: {e}")
 
     @property
     def oauth_request_body(self) -> dict:
@@ -57,11 +124,12 @@ class KlaviyoAuthenticator(OAuthAuthenticator, metaclass=SingletonMeta):
 
     @classmethod
     def create_for_stream(cls, stream) -> "KlaviyoAuthenticator":
-        return cls(
-            stream=stream,
-            auth_endpoint="https://a.klaviyo.com/oauth/token",
-            oauth_scopes="",
-        )
+        with cls._instance_lock:
+            return cls(
+                stream=stream,
+                auth_endpoint=urljoin(stream.url_base, "/oauth/token"),
+                oauth_scopes="",
+            )
 
     @backoff.on_exception(backoff.expo, Exception, max_tries=3)
     def update_access_token(self) -> None:
@@ -69,7 +137,7 @@ class KlaviyoAuthenticator(OAuthAuthenticator, metaclass=SingletonMeta):
             f"Oauth request - endpoint: {self._auth_endpoint}, body: {self.oauth_request_body}"
         )
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
-        token_response = requests.post(
+        token_response = get_session(self._tap.config).post(
             self._auth_endpoint,
             data=self.oauth_request_body,
             headers=headers,
@@ -95,5 +163,4 @@ class KlaviyoAuthenticator(OAuthAuthenticator, metaclass=SingletonMeta):
         self._tap._config["expires_in"] = now + token_json["expires_in"]
 
         if self._tap.config_file:
-            with open(self._tap.config_file, "w") as outfile:
-                json.dump(self._tap._config, outfile, indent=4)
+            write_json_atomic(self._tap.config_file, self._tap._config, indent=4)
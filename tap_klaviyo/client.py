@@ -1,27 +1,51 @@
 """REST client handling, including KlaviyoStream base class."""
 
-from datetime import datetime
-from typing import Any, Dict, Optional, Callable
+from concurrent.futures import Executor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Callable, Tuple
 
 import requests
-from backports.cached_property import cached_property
 from pendulum import parse, from_timestamp
 from hotglue_singer_sdk import typing as th
 from hotglue_singer_sdk.authenticators import APIKeyAuthenticator
 from hotglue_singer_sdk.exceptions import FatalAPIError, RetriableAPIError
 from hotglue_singer_sdk.helpers.jsonpath import extract_jsonpath
-from hotglue_singer_sdk.streams import RESTStream
+from hotglue_singer_sdk.streams import RESTStream, Stream
 
 from tap_klaviyo.exceptions import MissingPermissionsError, InvalidCredentialsError
 
 from tap_klaviyo.auth import KlaviyoAuthenticator
+from tap_klaviyo.inference import DEFAULT_SAMPLE_SIZE, SchemaInference
+from tap_klaviyo.decoding import (
+    ijson,
+    is_streamed,
+    iter_streamed_records,
+    response_json,
+    streamed_next_link,
+)
+from tap_klaviyo.files import write_json_atomic
+from tap_klaviyo.output import MessageWriter
+from tap_klaviyo.paging import DEFAULT_TARGET_LATENCY, AdaptivePageSize, with_page_size
+from tap_klaviyo.prefetch import PrefetchedRecords
+from tap_klaviyo.rate_limit import RateLimiter, expo_unless_throttled
+from tap_klaviyo.session import get_session
+from tap_klaviyo.telemetry import StreamTelemetry
+from tap_klaviyo.transform import RecordTransformer
 from urllib.parse import urlparse, parse_qs
-from urllib3.exceptions import ProtocolError, InvalidChunkLength
+from urllib3.exceptions import ProtocolError, InvalidChunkLength, ReadTimeoutError
 from requests.exceptions import  ReadTimeout, ChunkedEncodingError
 import backoff
 import os
 import json
 import logging
+import re
+import threading
+import time
+
+# errors raised while a streamed body is read, after the request itself succeeded
+STREAMED_BODY_ERRORS = (ReadTimeout, ReadTimeoutError, ChunkedEncodingError, ProtocolError)
+# attempts at reading a streamed page, as many as request_decorator makes for a request
+MAX_STREAMED_PAGE_TRIES = 8
 
 
 class KlaviyoStream(RESTStream):
@@ -31,6 +55,41 @@ class KlaviyoStream(RESTStream):
 
     records_jsonpath = "$.data[*]"
     next_page_token_jsonpath = "$.links.next"
+    api_revision = "2024-10-15"
+    # whether the sampled schema may be stored in the discovery cache
+    cache_schema = True
+    # JSON:API resource type, used for sparse fieldsets (fields[<type>]=...)
+    resource_type: Optional[str] = None
+    # record properties that are not resource attributes
+    resource_keys = ("type", "id", "links", "relationships")
+    # record properties added by post_process rather than returned by the API
+    derived_properties: tuple = ()
+    # whether the endpoint accepts sort=<replication key>
+    sortable = False
+    # largest page[size] the endpoint accepts; None if it does not support page[size]
+    max_page_size: Optional[int] = None
+    # whether pages can be parsed incrementally (records under data[*], cursor in links.next)
+    supports_streaming_json = True
+    # set on worker threads while they fetch prefetched child records
+    _prefetching = threading.local()
+
+    def __init__(
+        self,
+        tap,
+        name: Optional[str] = None,
+        schema: Optional[dict] = None,
+        path: Optional[str] = None,
+    ) -> None:
+        # RESTStream.__init__ builds a requests.Session (and pool) per stream, but every
+        # request goes through the shared session, so set up its other attributes here.
+        Stream.__init__(self, name=name, schema=schema, tap=tap)
+        if path:
+            self.path = path
+        self._http_headers: dict = {}
+        self._requests_session = None
+        self._sync_costs_lock = threading.Lock()
+        self._compiled_jsonpath = None
+        self._next_page_token_compiled_jsonpath = None
 
     @property
     def authenticator(self):
@@ -47,11 +106,257 @@ class KlaviyoStream(RESTStream):
         else:
             raise FatalAPIError("No valid authentication method found")    
 
+    @property
+    def requests_session(self) -> requests.Session:
+        """Pooled keep-alive session shared by every stream and the authenticator."""
+        return get_session(self.config)
+
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        """Per-endpoint request pacing shared by every stream of the tap."""
+        return self._tap.rate_limiter
+
+    def _rate_limit_key(self, method: str, path: str) -> str:
+        return f"{method} {path}"
+
+    @property
+    def telemetry(self) -> StreamTelemetry:
+        """Performance counters of this stream, shared by all its partitions."""
+        if "_telemetry" not in self.__dict__:
+            self.__dict__["_telemetry"] = self._tap.telemetry.for_stream(self.name)
+        return self.__dict__["_telemetry"]
+
+    def _write_telemetry(self) -> None:
+        """Emit the counters of this stream and its children as METRIC log lines."""
+        for stream in [self] + self.descendent_streams:
+            for metric, value in stream.telemetry.summary().items():
+                self._write_metric_log(
+                    {
+                        "type": "timer" if metric.endswith("_seconds") else "counter",
+                        "metric": metric,
+                        "value": value,
+                        "tags": {"stream": stream.name},
+                    },
+                    None,
+                )
+        path = self.config.get("metrics_summary_path")
+        if path:
+            # rewritten after every stream, so the file is complete when the run ends
+            write_json_atomic(path, self._tap.telemetry.summary())
+
+    def _sync_records(self, context: Optional[dict] = None) -> None:
+        try:
+            with self._tap.profiler.profile(self.name):
+                super()._sync_records(context)
+        finally:
+            self._flush_output()
+
+    def finalize_state_progress_markers(self, state: Optional[dict] = None) -> None:
+        super().finalize_state_progress_markers(state)
+        # called by sync_all once a top-level stream and its children have synced
+        if state is None and not self.parent_stream_type:
+            self._write_telemetry()
+            self._tap.profiler.dump([self.name] + [s.name for s in self.descendent_streams])
+
+    @property
+    def message_writer(self) -> Optional[MessageWriter]:
+        """Buffered record output shared by every stream, if enabled."""
+        return self._tap.message_writer
+
+    def _flush_output(self) -> None:
+        if self.message_writer is not None:
+            self.message_writer.flush()
+
+    def _write_record_message(self, record: dict) -> None:
+        if self.message_writer is None:
+            super()._write_record_message(record)
+            return
+        for record_message in self._generate_record_messages(record):
+            self.message_writer.write(record_message)
+
+    def _write_state_message(self) -> None:
+        # records written so far must precede the STATE that covers them
+        self._flush_output()
+        super()._write_state_message()
+
+    def _write_schema_message(self) -> None:
+        self._flush_output()
+        super()._write_schema_message()
+
+    @property
+    def page_size_controller(self) -> Optional[AdaptivePageSize]:
+        """Adaptive page[size] for endpoints that support it."""
+        if not self.max_page_size:
+            return None
+        if "_page_size_controller" not in self.__dict__:
+            self.__dict__["_page_size_controller"] = AdaptivePageSize(
+                maximum=self.max_page_size,
+                target_latency=float(
+                    self.config.get("page_size_target_latency") or DEFAULT_TARGET_LATENCY
+                ),
+                name=self.name,
+                logger=self.logger,
+            )
+        return self.__dict__["_page_size_controller"]
+
+    @property
+    def streaming_json(self) -> bool:
+        """Whether page bodies are parsed incrementally instead of decoded whole."""
+        return (
+            bool(self.config.get("streaming_json"))
+            and self.supports_streaming_json
+            and ijson is not None
+        )
+
+    def _request(
+        self, prepared_request: requests.PreparedRequest, context: Optional[dict]
+    ) -> requests.Response:
+        self.telemetry.record_rate_limit_wait(
+            self.rate_limiter.acquire(self._rate_limit_key(self.rest_method, self.path))
+        )
+        page_size = self.page_size_controller
+        if page_size is not None:
+            # set on the prepared request so retries pick up a reduced size
+            prepared_request.url = with_page_size(prepared_request.url, page_size.size)
+        try:
+            response = self._send(prepared_request, context)
+        except (ReadTimeout, ChunkedEncodingError) as e:
+            if page_size is not None:
+                page_size.record_failure(e)
+            raise
+        if is_streamed(response):
+            content_length = int(response.headers.get("Content-Length") or 0)
+        else:
+            content_length = len(response.content)
+        elapsed = response.elapsed.total_seconds()
+        self.telemetry.record_request(elapsed, content_length)
+        if page_size is not None:
+            page_size.record_success(elapsed, content_length)
+        return response
+
+    def _send(
+        self, prepared_request: requests.PreparedRequest, context: Optional[dict]
+    ) -> requests.Response:
+        """Send the request, leaving the body unread when streaming JSON."""
+        if not self.streaming_json:
+            return super()._request(prepared_request, context)
+        response = self.requests_session.send(
+            prepared_request, timeout=self.timeout, stream=True
+        )
+        if self._LOG_REQUEST_METRICS:
+            self._write_request_duration_log(
+                endpoint=self.path, response=response, context=context, extra_tags={}
+            )
+        self.validate_response(response)
+        response.__dict__["_streamed"] = True
+        return response
+
+    @property
+    def prefetch_pages(self) -> bool:
+        """Whether the next page is requested while the current one is emitted."""
+        # a streamed body only yields links.next once all its records were read
+        return bool(self.config.get("prefetch_pages")) and not self.streaming_json
+
+    def request_records(self, context: Optional[dict]) -> Iterable[dict]:
+        """Request pages in order, fetching the next one in the background if enabled.
+
+        Pages are prepared on the syncing thread, so state is only read there,
+        and at most one request is in flight ahead of the page being emitted.
+        """
+        if not self.prefetch_pages:
+            yield from super().request_records(context)
+            return
+        fetch = self._tap.profiler.wrap(self.name, self._fetch_page)
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            next_page_token = None
+            prepared_request = self.prepare_request(context, next_page_token=None)
+            pending = executor.submit(fetch, prepared_request, context)
+            while pending is not None:
+                response = pending.result()
+                self.update_sync_costs(prepared_request, response, context)
+                previous_token = next_page_token
+                next_page_token = self.get_next_page_token(
+                    response=response, previous_token=previous_token
+                )
+                if next_page_token and next_page_token == previous_token:
+                    raise RuntimeError(
+                        f"Loop detected in pagination. "
+                        f"Pagination token {next_page_token} is identical to prior token."
+                    )
+                pending = None
+                if next_page_token:
+                    prepared_request = self.prepare_request(
+                        context, next_page_token=next_page_token
+                    )
+                    pending = executor.submit(fetch, prepared_request, context)
+                yield from self.parse_response(response)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _fetch_page(
+        self, prepared_request: requests.PreparedRequest, context: Optional[dict]
+    ) -> requests.Response:
+        response = self.request_decorator(self._request)(prepared_request, context)
+        # decoded here, while the previous page is still being emitted
+        response_json(response)
+        return response
+
+    def parse_response(self, response: requests.Response) -> Iterable[dict]:
+        """Parse records from the page, decoding the body only once."""
+        if self.is_sorted:
+            # runs when the first record of this page is requested
+            self._write_page_checkpoint()
+        if is_streamed(response):
+            yield from self._iter_streamed_page(response)
+        else:
+            yield from extract_jsonpath(self.records_jsonpath, input=response_json(response))
+
+    def _iter_streamed_page(self, response: requests.Response) -> Iterable[dict]:
+        """Yield the records of a streamed page, sending it again if its body breaks off.
+
+        The body is read after `request_decorator` has returned, so its failures
+        are retried here; records already yielded are skipped on the new copy.
+        """
+        yielded = 0
+        page = response
+        for attempt in range(1, MAX_STREAMED_PAGE_TRIES + 1):
+            try:
+                for index, record in enumerate(iter_streamed_records(page)):
+                    if index >= yielded:
+                        yielded += 1
+                        yield record
+                break
+            except STREAMED_BODY_ERRORS as e:
+                if self.page_size_controller is not None:
+                    self.page_size_controller.record_failure(e)
+                if attempt == MAX_STREAMED_PAGE_TRIES:
+                    raise
+                self.logger.warning(
+                    f"Reading a {self.name} page failed after {yielded} records ({e!r}); requesting it again."
+                )
+                page = self.request_decorator(self._resend)(response.request, None)
+        # the next page token is read from the response the page was first parsed from
+        response.__dict__["_streamed_next_link"] = streamed_next_link(page)
+
+    def _resend(
+        self, prepared_request: requests.PreparedRequest, context: Optional[dict]
+    ) -> requests.Response:
+        """Send a page again as it was first sent, so its records keep their positions."""
+        self.telemetry.record_rate_limit_wait(
+            self.rate_limiter.acquire(self._rate_limit_key(self.rest_method, self.path))
+        )
+        return self._send(prepared_request, context)
+
+    def validate_response(self, response: requests.Response) -> None:
+        self.rate_limiter.update(self._rate_limit_key(self.rest_method, self.path), response)
+        super().validate_response(response)
+
     @property
     def http_headers(self) -> dict:
         """Return the http headers needed."""
         headers = {}
-        headers["revision"] = "2024-10-15"
+        headers["revision"] = self.api_revision
         if "user_agent" in self.config:
             headers["User-Agent"] = self.config.get("user_agent")
         return headers
@@ -61,10 +366,13 @@ class KlaviyoStream(RESTStream):
     ) -> Optional[Any]:
         """Return a token for identifying next page or None if no more pages."""
         if self.next_page_token_jsonpath:
-            all_matches = extract_jsonpath(
-                self.next_page_token_jsonpath, response.json()
-            )
-            token_link = next(iter(all_matches), None)
+            if is_streamed(response):
+                token_link = streamed_next_link(response)
+            else:
+                all_matches = extract_jsonpath(
+                    self.next_page_token_jsonpath, response_json(response)
+                )
+                token_link = next(iter(all_matches), None)
             if token_link:
                 parsed_url = urlparse(token_link)
                 # Extract the query parameters
@@ -78,6 +386,9 @@ class KlaviyoStream(RESTStream):
         return None        
 
     def get_starting_time(self, context):
+        # windowed contexts (e.g. the single-pass events scan) carry their own start
+        if context and "window_start" in context:
+            return context["window_start"]
         start_date = self.config.get("start_date")
         if start_date:
             start_date = parse(self.config.get("start_date"))
@@ -94,24 +405,205 @@ class KlaviyoStream(RESTStream):
         start_date = self.get_starting_time(context)
         if self.replication_key and start_date:
             start_date = start_date.strftime("%Y-%m-%dT%H:%M:%SZ")
-            if self.config.get("end_date"):
-                end_date = self.config.get("end_date")
-                end_date = parse(self.config.get("end_date"))
+            end_date = self.get_ending_time(context)
+            if end_date:
                 end_date = end_date.strftime("%Y-%m-%dT%H:%M:%SZ")
                 params["filter"] = f"and(greater-than({self.replication_key},{start_date}),less-or-equal({self.replication_key},{end_date}))"
             else:
                 params["filter"] = f"greater-than({self.replication_key},{start_date})"
+        if self.is_sorted:
+            params["sort"] = self.replication_key
 
+        params.update(self.get_sparse_fieldset_params())
         return params
 
+    @property
+    def selected_attributes(self) -> Optional[List[str]]:
+        """Attributes selected in the input catalog, or None if every attribute is needed."""
+        if "_selected_attributes" not in self.__dict__:
+            self.__dict__["_selected_attributes"] = self._get_selected_attributes()
+        return self.__dict__["_selected_attributes"]
+
+    def _get_selected_attributes(self) -> Optional[List[str]]:
+        if not self.config.get("sparse_fieldsets") or self._tap.input_catalog is None:
+            return None
+        attributes = [
+            name
+            for name in self.schema.get("properties", {})
+            if name not in self.resource_keys and name not in self.derived_properties
+        ]
+        selected = [name for name in attributes if self.mask[("properties", name)]]
+        if self.replication_key in attributes and self.replication_key not in selected:
+            selected.append(self.replication_key)
+        if not selected or len(selected) == len(attributes):
+            return None
+        return selected
+
+    def get_sparse_fieldset_params(self) -> Dict[str, str]:
+        """Return the fields[<type>] param restricting responses to selected attributes."""
+        if not self.resource_type or not self.selected_attributes:
+            return {}
+        return {f"fields[{self.resource_type}]": ",".join(self.selected_attributes)}
+
+    def get_ending_time(self, context):
+        """Return the upper bound of the sync: the paging window end or `end_date`."""
+        if context and context.get("window_end"):
+            return context["window_end"]
+        if self.config.get("end_date"):
+            return parse(self.config.get("end_date"))
+        return None
+
+    def get_time_slices(self, context, slice_days: int) -> List[Dict[str, Any]]:
+        """Split the sync range into consecutive `window_start`/`window_end` windows.
+
+        Each window becomes its own greater-than/less-or-equal filter, so windows can
+        be fetched independently (see `parallelization_limit`).
+        """
+        start_date = self.get_starting_time(context)
+        if not self.replication_key or not start_date or not slice_days:
+            return []
+        end_date = self.get_ending_time(context) or datetime.now(timezone.utc)
+        windows = []
+        window_start = start_date
+        while window_start < end_date:
+            window_end = min(window_start + timedelta(days=slice_days), end_date)
+            windows.append({"window_start": window_start, "window_end": window_end})
+            window_start = window_end
+        return windows
+
+    @property
+    def parallelization_limit(self) -> int:
+        """Parent contexts whose child records are fetched at once (`child_max_workers`)."""
+        if self.parent_stream_type:
+            return int(self.config.get("child_max_workers") or 1)
+        return 1
+
+    def _sync_children_with_threads(self, child_contexts: List[dict]) -> None:
+        """Fetch child records for several parents at once, syncing them in parent order.
+
+        Workers only fetch records; records and state are written from this thread,
+        one parent context after the other, exactly as a serial sync would.
+        """
+        child_streams = [
+            child_stream
+            for child_stream in self.child_streams
+            if child_stream.selected or child_stream.has_selected_descendents
+        ]
+        prefetched = []
+        with ThreadPoolExecutor(max_workers=self.get_child_threads()) as executor:
+            try:
+                # submitted in consumption order, so the context being synced is
+                # always running or done and the bounded buffers cannot deadlock
+                for child_context in child_contexts:
+                    for child_stream in child_streams:
+                        prefetched.append(
+                            (child_stream, child_context, child_stream.prefetch(executor, child_context))
+                        )
+                for child_context in child_contexts:
+                    self._sync_children(child_context)
+            finally:
+                for child_stream, child_context, records in prefetched:
+                    records.cancel()
+                    child_stream.__dict__.get("_prefetched", {}).pop(
+                        self._context_key(child_context), None
+                    )
+
+    @staticmethod
+    def _context_key(context: dict) -> str:
+        return json.dumps(context, sort_keys=True, default=str)
+
+    def prefetch(self, executor: Executor, context: dict) -> PrefetchedRecords:
+        """Start fetching the records of `context` on `executor`.
+
+        The next `get_records(context)` call on another thread reads them back.
+        """
+        self.state_partitioning_keys = list(
+            set(self.state_partitioning_keys or []) | set(context.keys())
+        )
+        # create the partition state and its starting bookmark here, as _sync_records
+        # would, since the worker requests records before this context is synced
+        self.get_context_state(context)
+        self._write_starting_replication_value(context)
+        records = PrefetchedRecords()
+        self.__dict__.setdefault("_prefetched", {})[self._context_key(context)] = records
+        executor.submit(self._tap.profiler.wrap(self.name, self._produce), records, context)
+        return records
+
+    def _produce(self, records: PrefetchedRecords, context: dict) -> None:
+        self._prefetching.active = True
+        try:
+            records.produce(self.get_records(context))
+        finally:
+            self._prefetching.active = False
+
+    def get_records(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        prefetched = None
+        if context and not getattr(self._prefetching, "active", False):
+            prefetched = self.__dict__.get("_prefetched", {}).pop(
+                self._context_key(context), None
+            )
+        if prefetched is None:
+            yield from super().get_records(context)
+        else:
+            yield from prefetched
+        if self.is_sorted:
+            # the last record has been emitted, its value can be bookmarked
+            self._commit_replication_value(context)
+
+    @property
+    def is_sorted(self) -> bool:
+        """Whether records are requested in replication key order and checkpointed per page.
+
+        Parallel windows are emitted as they complete, so they are never sorted.
+        """
+        if "_is_sorted" not in self.__dict__:
+            self.__dict__["_is_sorted"] = (
+                bool(self.config.get("checkpoint_pages"))
+                and self.parallelization_limit <= 1
+                and self.sortable
+            )
+        return self.__dict__["_is_sorted"]
+
+    def _increment_stream_state(
+        self, latest_record: Dict[str, Any], *, context: Optional[dict] = None
+    ) -> None:
+        if not self.is_sorted:
+            super()._increment_stream_state(latest_record, context=context)
+            return
+        # Records sharing a timestamp may span pages, and a resumed sync filters on
+        # greater-than, so a value is only bookmarked once a later value is seen.
+        value = latest_record[self.replication_key]
+        pending = self.__dict__.get("_pending_replication_value")
+        if pending is not None and value != pending:
+            self._commit_replication_value(context)
+        self.__dict__["_pending_replication_value"] = value
+
+    def _commit_replication_value(self, context: Optional[dict]) -> None:
+        pending = self.__dict__.pop("_pending_replication_value", None)
+        if pending is not None:
+            super()._increment_stream_state(
+                {self.replication_key: pending}, context=context
+            )
+
+    def _write_page_checkpoint(self) -> None:
+        """Write a resumable STATE once the previous page's records were all emitted."""
+        value = self.stream_state.get("replication_key_value")
+        if value != self.__dict__.get("_checkpointed_value"):
+            self.__dict__["_checkpointed_value"] = value
+            self._write_state_message()
+
+    @property
+    def record_transformer(self) -> RecordTransformer:
+        """Transformer compiled once from the stream schema."""
+        if "_record_transformer" not in self.__dict__:
+            self.__dict__["_record_transformer"] = RecordTransformer(self.schema)
+        return self.__dict__["_record_transformer"]
+
     def post_process(self, row, context):
+        start = time.perf_counter()
         row = super().post_process(row, context)
-        for key, value in row.get("attributes", {}).items():
-            row[key] = value
-        row.pop("attributes", None)
-        for key, value in row.items():
-            if self.schema.get("properties", {}).get(key, {}).get("format") == "date-time" and value is not None:
-                row[key] = parse(value).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+        row = self.record_transformer(row, self.selected_attributes)
+        self.telemetry.record_post_process(time.perf_counter() - start)
         return row
 
     def is_unix_timestamp(self, date):
@@ -153,13 +645,6 @@ class KlaviyoStream(RESTStream):
             record.update(attributes)
         return record
 
-    def _first_non_null_value(self, records: list, field_name: str) -> Any:
-        for record in records:
-            value = record.get(field_name)
-            if value is not None:
-                return value
-        return None
-
     def _infer_property_type(self, name: str, value: Any) -> th.Property:
         if name in ["event_properties", "properties"]:
             return th.Property(name, th.CustomType({"type": ["object", "string"]}))
@@ -255,7 +740,6 @@ class KlaviyoStream(RESTStream):
                 "properties": {}
             }
         
-        self._requests_session = requests.Session()
         # Get the data
         headers = self.http_headers
         headers.update(self.authenticator.auth_headers)
@@ -264,6 +748,8 @@ class KlaviyoStream(RESTStream):
         request_type = self.rest_method
         url = self.url_base + path
 
+        sample_size = int(self.config.get("discovery_sample_size") or DEFAULT_SAMPLE_SIZE)
+
         # discover for child streams
         if self.parent_stream_type:
             parent_url = self.url_base + self.parent_stream_type.path
@@ -273,31 +759,18 @@ class KlaviyoStream(RESTStream):
             parent_id = parent_records[0]["id"] if parent_records else None
             if parent_id:
                 url = url.replace("{id}", parent_id)
-                records = self.request_decorator(self.get_data)(
-                    request_type, url, headers
-                )
+                records = self._iter_discovery_records(request_type, url, headers, sample_size)
             else:
                 records = []
         else:
-            records = self.request_decorator(self.get_data)(request_type, url, headers)
-
-        if len(records) > 0:
-            flattened_records = [self._flatten_discovery_record(record) for record in records]
-            property_names: list[str] = []
-            seen: set[str] = set()
-            for record in flattened_records:
-                for name in record.keys():
-                    if name not in seen:
-                        seen.add(name)
-                        property_names.append(name)
-
-            properties = [
-                self._infer_property_type(
-                    name, self._first_non_null_value(flattened_records, name)
-                )
-                for name in property_names
-            ]
-            property_list = th.PropertiesList(*properties).to_dict()
+            records = self._iter_discovery_records(request_type, url, headers, sample_size)
+
+        inference = SchemaInference(
+            lambda name, value: self._infer_property_type(name, value).to_dict()[name]
+        ).add_all(self._flatten_discovery_record(record) for record in records)
+
+        if inference.record_count > 0:
+            property_list = {"type": "object", "properties": inference.properties()}
         else:
             property_list = th.PropertiesList(
                 th.Property("id", th.StringType),
@@ -316,7 +789,7 @@ class KlaviyoStream(RESTStream):
         if error_code is None:
             return True
         try:
-            body = response.json()
+            body = response_json(response)
         except Exception:
             return False
         errors = body.get("errors") if isinstance(body, dict) else []
@@ -334,19 +807,64 @@ class KlaviyoStream(RESTStream):
         """True if response is 401."""
         return self._is_error_response(response, 401)
 
+    def _iter_discovery_records(
+        self, method: str, url: str, headers: dict, limit: int
+    ) -> Iterable[dict]:
+        """Yield up to `limit` records for schema inference, following `links.next`."""
+        if self.max_page_size:
+            url = with_page_size(url, min(self.max_page_size, limit))
+        records, next_url = self.request_decorator(self.get_data_page)(method, url, headers)
+        count = 0
+        while True:
+            for record in records:
+                if count >= limit:
+                    return
+                count += 1
+                yield record
+            if not records or not next_url or count >= limit:
+                return
+            # the next link already carries the query, so skip get_data_page overrides
+            records, next_url = self.request_decorator(KlaviyoStream.get_data_page)(
+                self, method, next_url, headers
+            )
+
+    def _endpoint_path(self, url: str) -> str:
+        """Return the path template of `url` (e.g. "/lists/{id}/profiles"), as sync paces it."""
+        path = urlparse(url).path[len(urlparse(self.url_base).path):]
+        templates = [self.path]
+        if self.parent_stream_type:
+            templates.append(self.parent_stream_type.path)
+        for template in templates:
+            # paths hold letters, dashes and slashes, so only {placeholders} need replacing
+            if re.fullmatch(re.sub(r"\{\w+\}", "[^/]+", template), path):
+                return template
+        return path
+
     def get_data(self, method: str, url: str, headers: dict) -> list:
-        response = requests.request(
+        """Return the records of one page, for schema discovery."""
+        return self.get_data_page(method, url, headers)[0]
+
+    def get_data_page(
+        self, method: str, url: str, headers: dict
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Return the records of one page and its `links.next`, for schema discovery."""
+        rate_limit_key = self._rate_limit_key(method, self._endpoint_path(url))
+        self.telemetry.record_rate_limit_wait(self.rate_limiter.acquire(rate_limit_key))
+        response = self.requests_session.request(
             method=method,
             url=url,
             headers=headers,
             timeout=self.timeout,
         )
+        self.telemetry.record_request(response.elapsed.total_seconds(), len(response.content))
+        self.rate_limiter.update(rate_limit_key, response)
         if response.status_code == 200:
-            return response.json()["data"]
+            body = response_json(response)
+            return body["data"], (body.get("links") or {}).get("next")
 
         response_text = response.text
         try:
-            json_response = response.json()
+            json_response = response_json(response)
             errors = json_response.get("errors")
             error_message = next(iter(errors), None)
             error_message.pop("id", None)
@@ -363,14 +881,32 @@ class KlaviyoStream(RESTStream):
                     f"There was an error when fetching data for schemas. Status code: {response.status_code}, Response: {response_text}"
                 )
 
-    @cached_property
+    @property
     def schema(self) -> dict:
-        return self.get_schema()
+        # cached per instance: cached_property holds one lock for all instances,
+        # which would serialize concurrent discovery
+        schema = self.__dict__.get("_discovered_schema")
+        if schema is None:
+            schema = self.__dict__["_discovered_schema"] = self._get_cached_schema()
+        return schema
+
+    def _get_cached_schema(self) -> dict:
+        """Return the schema from the discovery cache, sampling it on a miss."""
+        cache = self._tap.schema_cache if self.cache_schema else None
+        schema = cache.get(self.name, self.api_revision) if cache else None
+        if schema is None:
+            schema = self.get_schema()
+            if cache and schema.get("properties"):
+                cache.put(self.name, self.api_revision, schema)
+        return schema
     
+    def _on_backoff(self, details: dict) -> None:
+        self.telemetry.record_retry(details.get("wait") or 0)
+
     def request_decorator(self, func: Callable) -> Callable:
         """Instantiate a decorator for handling request failures."""
         decorator: Callable = backoff.on_exception(
-            backoff.expo,
+            expo_unless_throttled,
             (
                 RetriableAPIError,
                 ReadTimeout,
@@ -382,6 +918,8 @@ class KlaviyoStream(RESTStream):
                 ChunkedEncodingError,
             ),
             max_tries=8,
+            on_backoff=self._on_backoff,
+            rate_limiter=self.rate_limiter,
             factor=5,
         )(func)
         return decorator
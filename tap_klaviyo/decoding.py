@@ -0,0 +1,52 @@
+"""Decode Klaviyo response bodies once, optionally as a stream."""
+
+from typing import Any, Iterable
+
+import requests
+
+try:
+    import ijson
+except ImportError:  # optional dependency, installed with the "streaming" extra
+    ijson = None
+
+
+def response_json(response: requests.Response) -> Any:
+    """Return the decoded JSON body, decoding it only once per response."""
+    cache = response.__dict__
+    if "_parsed_json" not in cache:
+        cache["_parsed_json"] = response.json()
+    return cache["_parsed_json"]
+
+
+def is_streamed(response: requests.Response) -> bool:
+    """True if the response body is read incrementally by `iter_streamed_records`."""
+    return response.__dict__.get("_streamed", False)
+
+
+def streamed_next_link(response: requests.Response) -> Any:
+    """Return `links.next` captured while streaming the response body."""
+    return response.__dict__.get("_streamed_next_link")
+
+
+def iter_streamed_records(response: requests.Response) -> Iterable[dict]:
+    """Yield `data[*]` items without building the whole document.
+
+    `links.next` is captured on the way and exposed through `streamed_next_link`.
+    The response is closed once the body has been read.
+    """
+    response.raw.decode_content = True
+    builder = None
+    try:
+        for prefix, event, value in ijson.parse(response.raw, use_float=True):
+            if builder is not None:
+                builder.event(event, value)
+                if prefix == "data.item" and event == "end_map":
+                    yield builder.value
+                    builder = None
+            elif prefix == "data.item" and event == "start_map":
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+            elif prefix == "links.next" and event in ("string", "null"):
+                response.__dict__["_streamed_next_link"] = value
+    finally:
+        response.close()
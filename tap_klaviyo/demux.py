@@ -0,0 +1,121 @@
+"""Single-pass /events extraction shared by the events streams."""
+
+import json
+import tempfile
+import threading
+from contextlib import ExitStack
+from typing import Any, Dict, Iterable, List, Optional
+
+from pendulum import parse
+
+
+class EventsDemultiplexer:
+    """Page /events once and route each record to the events streams that need it.
+
+    Records are routed by `relationships.metric.data.id` and spooled to a temporary
+    file per stream, so memory stays flat while streams wait for their turn to sync.
+    Each stream keeps its own bookmark: records at or before its starting time are
+    dropped when the stream reads its spool.
+    """
+
+    def __init__(self, streams: List[Any]):
+        self.streams = streams
+        self._spools: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._scanned = False
+        self._window_start = None
+
+    def handles(self, stream) -> bool:
+        """Return True if the stream is fed from the shared scan."""
+        return any(s.name == stream.name for s in self.streams)
+
+    def _get_window_start(self):
+        """Return the earliest starting time among the streams (None means no bound)."""
+        starts = [stream.get_starting_time(None) for stream in self.streams]
+        if any(start is None for start in starts):
+            return None
+        return min(starts)
+
+    def _scan(self, scanner) -> None:
+        """Page /events once and spool every record to its target streams."""
+        self._window_start = self._get_window_start()
+        by_metric: Dict[str, list] = {}
+        all_metrics: list = []
+        with ExitStack() as spools:
+            for stream in self.streams:
+                spool = spools.enter_context(tempfile.TemporaryFile(mode="w+", encoding="utf-8"))
+                self._spools[stream.name] = spool
+                if stream.metric_id:
+                    by_metric.setdefault(stream.metric_id, []).append(spool)
+                else:
+                    all_metrics.append(spool)
+            self._route(scanner, by_metric, all_metrics)
+            # the spools outlive the scan, until each stream has read its own
+            spools.pop_all()
+
+    def _route(self, scanner, by_metric: Dict[str, list], all_metrics: list) -> None:
+        """Write each scanned record to the spools of its metric and of the base stream."""
+        scanner.logger.info(
+            f"Single-pass events scan for {len(self.streams)} streams "
+            f"starting at {self._window_start}."
+        )
+        record_count = 0
+        context = {"window_start": self._window_start, "all_metrics": True}
+        for record in scanner.request_records(context):
+            metric = ((record.get("relationships") or {}).get("metric") or {}).get("data") or {}
+            targets = by_metric.get(metric.get("id"), [])
+            if not targets and not all_metrics:
+                continue
+            line = json.dumps(record) + "\n"
+            for spool in targets:
+                spool.write(line)
+            for spool in all_metrics:
+                spool.write(line)
+            record_count += 1
+        scanner.logger.info(f"Single-pass events scan routed {record_count} records.")
+
+        for spool in self._spools.values():
+            spool.seek(0)
+
+    def close(self) -> None:
+        """Close the spools no stream has read yet."""
+        with self._lock:
+            spools = list(self._spools.values())
+            self._spools.clear()
+        for spool in spools:
+            spool.close()
+
+    def records_for(self, stream) -> Iterable[dict]:
+        """Yield the raw records routed to the given stream.
+
+        If the scan or reading a spool fails, the sync stops, so every remaining
+        spool is closed.
+        """
+        try:
+            yield from self._read_spool(stream)
+        except Exception:
+            self.close()
+            raise
+
+    def _read_spool(self, stream) -> Iterable[dict]:
+        with self._lock:
+            if not self._scanned:
+                self._scan(stream)
+                self._scanned = True
+            spool = self._spools.pop(stream.name, None)
+        if spool is None:
+            return
+
+        start = stream.get_starting_time(None)
+        check_start = start is not None and (
+            self._window_start is None or start > self._window_start
+        )
+        replication_key = stream.replication_key
+        with spool:
+            for line in spool:
+                record = json.loads(line)
+                if check_start:
+                    value: Optional[str] = (record.get("attributes") or {}).get(replication_key)
+                    if value and parse(value) <= start:
+                        continue
+                yield record
@@ -0,0 +1,32 @@
+"""Helpers for the JSON files the tap writes: config, caches and metrics summaries."""
+
+import json
+import os
+import stat
+import tempfile
+from typing import Any, Optional
+
+
+def write_json_atomic(path: str, data: Any, indent: Optional[int] = None) -> None:
+    """Write `data` to `path` through a temporary file, so readers never see a partial file.
+
+    An existing file keeps its permissions. A symlinked file, or a file in a
+    directory the tap cannot create files in, is written in place instead, so
+    the link is kept and the write does not fail.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    if os.path.islink(path) or not os.access(directory, os.W_OK):
+        with open(path, "w") as json_file:
+            json.dump(data, json_file, indent=indent)
+        return
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as tmp_file:
+            json.dump(data, tmp_file, indent=indent)
+        if os.path.exists(path):
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(path).st_mode))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
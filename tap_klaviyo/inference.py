@@ -0,0 +1,98 @@
+"""Streaming schema inference over sampled discovery records."""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+DEFAULT_SAMPLE_SIZE = 200
+# nested objects with more keys than this are treated as free-form
+MAX_NESTED_PROPERTIES = 500
+UNKNOWN_TYPES = ["string", "number", "object", "boolean"]
+
+
+def _types(schema: dict) -> List[str]:
+    types = schema.get("type", [])
+    return [types] if isinstance(types, str) else list(types)
+
+
+def merge_schemas(left: dict, right: dict) -> dict:
+    """Return a JSON schema accepting every value accepted by `left` or `right`."""
+    types = _types(left)
+    types += [t for t in _types(right) if t not in types]
+    if "integer" in types and "number" in types:
+        types = [t for t in types if t != "number"]
+        types[types.index("integer")] = "number"
+    merged: Dict[str, Any] = {"type": types}
+
+    # a format only holds if every side that allows strings has it
+    formats = {
+        side.get("format") for side in (left, right) if "string" in _types(side)
+    }
+    if len(formats) == 1 and None not in formats:
+        merged["format"] = formats.pop()
+
+    if "properties" in left or "properties" in right:
+        properties = dict(left.get("properties", {}))
+        for name, schema in right.get("properties", {}).items():
+            properties[name] = (
+                merge_schemas(properties[name], schema) if name in properties else schema
+            )
+        if len(properties) > MAX_NESTED_PROPERTIES:
+            merged["type"] = types + [t for t in UNKNOWN_TYPES if t not in types]
+        else:
+            merged["properties"] = properties
+
+    if "items" in left and "items" in right:
+        merged["items"] = merge_schemas(left["items"], right["items"])
+    elif "items" in left or "items" in right:
+        merged["items"] = left.get("items") or right.get("items")
+    return merged
+
+
+def without_coercible_boolean(schema: dict) -> dict:
+    """Drop "boolean" from a top-level schema that also allows other types.
+
+    The SDK record conformer coerces values of top-level properties listing
+    "boolean" through `elem != 0`, which would turn strings and objects into True.
+    """
+    types = _types(schema)
+    if "boolean" in types and len([t for t in types if t != "null"]) > 1:
+        schema = dict(schema, type=[t for t in types if t != "boolean"])
+    return schema
+
+
+class SchemaInference:
+    """Merge the inferred JSON schema of each field over a sample of records.
+
+    Only the merged schema of each field is kept, never the records, so memory
+    depends on the shape of the data rather than on the sample size. `infer` maps a
+    (name, value) pair to the property schema of that single value.
+    """
+
+    def __init__(self, infer: Callable[[str, Any], dict]):
+        self._infer = infer
+        # in first-seen order; None until a non-null value is seen
+        self._fields: Dict[str, Optional[dict]] = {}
+        self.record_count = 0
+
+    def add(self, record: dict) -> None:
+        self.record_count += 1
+        for name, value in record.items():
+            current = self._fields.get(name)
+            if value is None:
+                self._fields.setdefault(name, None)
+                continue
+            schema = self._infer(name, value)
+            self._fields[name] = schema if current is None else merge_schemas(current, schema)
+
+    def add_all(self, records: Iterable[dict]) -> "SchemaInference":
+        for record in records:
+            self.add(record)
+        return self
+
+    def properties(self) -> Dict[str, dict]:
+        """Return the merged property schemas, in the order fields were first seen."""
+        return {
+            name: without_coercible_boolean(
+                self._infer(name, None) if schema is None else schema
+            )
+            for name, schema in self._fields.items()
+        }
@@ -0,0 +1,153 @@
+"""Registry of the account's Klaviyo metrics, stored between runs."""
+
+import json
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from tap_klaviyo.files import write_json_atomic
+from tap_klaviyo.schema_cache import DEFAULT_TTL
+
+REGISTRY_VERSION = 1
+
+
+def normalize_metric_name(name: str) -> str:
+    """Return the form metric names are matched on ("Opened Email" -> "openedemail")."""
+    return name.lower().replace(" ", "")
+
+
+class MetricRegistry:
+    """The account's metrics, indexed by id and by normalized name.
+
+    Metrics are read from `path` while they are younger than `ttl` seconds, and
+    listed from the API otherwise. A lookup that misses triggers one refresh per
+    run, so metrics created since the registry was stored are still found.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Iterable[dict]],
+        path: Optional[str] = None,
+        account: str = "",
+        ttl: float = DEFAULT_TTL,
+        clock=time.time,
+    ):
+        self._fetch = fetch
+        self.path = path
+        self.account = account
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._metrics: Optional[List[dict]] = None
+        self._by_id: Dict[str, dict] = {}
+        self._by_name: Dict[str, str] = {}
+        self._fetched_at = 0.0
+        self._refreshed = False
+        self._dirty = False
+
+    def _load(self, expired: bool = False) -> Optional[List[dict]]:
+        """Return the stored metrics, or None if there are none or, unless `expired`, they expired."""
+        if not self.path:
+            return None
+        try:
+            with open(self.path) as registry_file:
+                data = json.load(registry_file)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != REGISTRY_VERSION or data.get("account") != self.account:
+            return None
+        if not expired:
+            if self._clock() - data.get("fetched_at", 0) > self.ttl:
+                return None
+            self._fetched_at = data["fetched_at"]
+        return data.get("metrics")
+
+    def _index(self, metrics: List[dict]) -> None:
+        self._metrics = metrics
+        self._by_id = {metric["id"]: metric for metric in metrics}
+        self._by_name = {}
+        for metric in metrics:
+            # keep the first match, as the previous linear scan did
+            self._by_name.setdefault(normalize_metric_name(metric["attributes"]["name"]), metric["id"])
+
+    def refresh(self) -> None:
+        """List the metrics from the API and rebuild the index."""
+        with self._lock:
+            self._index(list(self._fetch()))
+            self._fetched_at = self._clock()
+            self._refreshed = True
+            self._dirty = True
+
+    def sync(self) -> List[dict]:
+        """Load the metrics, and return those created or updated since the stored listing.
+
+        Stored metrics are reused while they are younger than the TTL, and then
+        nothing is returned. Otherwise they are listed again; the metrics endpoint
+        cannot filter on `updated`, so changes are found by comparing each
+        metric's `updated` attribute with the expired listing.
+        """
+        with self._lock:
+            if self._metrics is not None:
+                return []
+            metrics = self._load()
+            if metrics is not None:
+                self._index(metrics)
+                return []
+            previous = {metric["id"]: metric for metric in self._load(expired=True) or []}
+            self.refresh()
+            return [
+                metric
+                for metric in self._metrics
+                if metric["id"] not in previous
+                or metric["attributes"].get("updated")
+                != previous[metric["id"]]["attributes"].get("updated")
+            ]
+
+    def _ensure_loaded(self) -> None:
+        """Load the stored metrics, or list them if there are none or they expired."""
+        with self._lock:
+            if self._metrics is None:
+                metrics = self._load()
+                if metrics is None:
+                    self.refresh()
+                else:
+                    self._index(metrics)
+
+    @property
+    def metrics(self) -> List[dict]:
+        with self._lock:
+            self._ensure_loaded()
+            return self._metrics
+
+    def id_for_name(self, metric_name: str) -> Optional[str]:
+        """Return the id of the metric named `metric_name`, ignoring case and spaces."""
+        with self._lock:
+            self._ensure_loaded()
+            name = normalize_metric_name(metric_name)
+            if name not in self._by_name and not self._refreshed:
+                self.refresh()
+            return self._by_name.get(name)
+
+    def get(self, metric_id: str) -> Optional[dict]:
+        """Return the metric with id `metric_id`."""
+        with self._lock:
+            self._ensure_loaded()
+            if metric_id not in self._by_id and not self._refreshed:
+                self.refresh()
+            return self._by_id.get(metric_id)
+
+    def save(self) -> None:
+        """Store the metrics if they were listed from the API during this run."""
+        with self._lock:
+            if not self.path or not self._dirty:
+                return
+            write_json_atomic(
+                self.path,
+                {
+                    "version": REGISTRY_VERSION,
+                    "account": self.account,
+                    "fetched_at": self._fetched_at,
+                    "metrics": self._metrics,
+                },
+            )
+            self._dirty = False
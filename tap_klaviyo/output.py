@@ -0,0 +1,53 @@
+"""Buffered Singer message output with a fast JSON encoder."""
+
+import sys
+from typing import List
+
+import singer
+
+try:
+    import orjson
+except ImportError:  # optional dependency, installed with the "fast_json" extra
+    orjson = None
+
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+
+def format_message(message: singer.Message) -> str:
+    """Serialize a message as one line of JSON, newline included."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(message.asdict(), option=orjson.OPT_APPEND_NEWLINE).decode()
+        except TypeError:
+            # Decimals, integers over 64 bits and non-string keys
+            pass
+    return singer.format_message(message) + "\n"
+
+
+class MessageWriter:
+    """Write messages to stdout in large chunks instead of one write per message.
+
+    Callers flush before anything else is written to stdout, e.g. STATE, so
+    messages keep their order.
+    """
+
+    def __init__(self, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self._lines: List[str] = []
+        self._size = 0
+
+    def write(self, message: singer.Message) -> None:
+        line = format_message(message)
+        self._lines.append(line)
+        self._size += len(line)
+        if self._size >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._lines:
+            return
+        # looked up on each flush, stdout may have been redirected
+        sys.stdout.write("".join(self._lines))
+        sys.stdout.flush()
+        self._lines = []
+        self._size = 0
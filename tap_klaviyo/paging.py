@@ -0,0 +1,66 @@
+"""Adaptive page size control for cursor-paginated streams."""
+
+import logging
+import threading
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+DEFAULT_TARGET_LATENCY = 10.0
+DEFAULT_MAX_PAGE_BYTES = 20 * 1024 * 1024
+
+
+def with_page_size(url: str, page_size: int) -> str:
+    """Return `url` with its page[size] query parameter set to `page_size`."""
+    parsed = urlparse(url)
+    query = [
+        (key, value)
+        for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key != "page[size]"
+    ]
+    query.append(("page[size]", str(page_size)))
+    return urlunparse(parsed._replace(query=urlencode(query)))
+
+
+class AdaptivePageSize:
+    """Page size that starts at the endpoint maximum and adapts to the responses.
+
+    Slow or oversized pages halve the size, as do timeouts and broken chunked
+    responses. Fast pages double it again, never exceeding `maximum`.
+    """
+
+    def __init__(
+        self,
+        maximum: int,
+        minimum: int = 1,
+        target_latency: float = DEFAULT_TARGET_LATENCY,
+        max_page_bytes: int = DEFAULT_MAX_PAGE_BYTES,
+        name: str = "",
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.target_latency = target_latency
+        self.max_page_bytes = max_page_bytes
+        self.name = name
+        self.logger = logger or logging.getLogger(__name__)
+        self.size = maximum
+        self._lock = threading.Lock()
+
+    def _set(self, size: int, reason: str) -> None:
+        size = max(self.minimum, min(self.maximum, size))
+        if size != self.size:
+            self.logger.info(f"Page size for stream {self.name} changed {self.size} -> {size} ({reason}).")
+            self.size = size
+
+    def record_success(self, elapsed: float, content_length: int) -> None:
+        with self._lock:
+            if elapsed > self.target_latency:
+                self._set(self.size // 2, f"page took {elapsed:.1f}s")
+            elif content_length > self.max_page_bytes:
+                self._set(self.size // 2, f"page was {content_length} bytes")
+            elif elapsed < self.target_latency / 4 and self.size < self.maximum:
+                self._set(self.size * 2, f"page took {elapsed:.1f}s")
+
+    def record_failure(self, error: Exception) -> None:
+        with self._lock:
+            self._set(self.size // 2, type(error).__name__)
@@ -0,0 +1,60 @@
+"""Bounded background fetching of child stream records."""
+
+import queue
+import threading
+from typing import Any, Iterable, Iterator
+
+DEFAULT_BUFFER_SIZE = 1000
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+class PrefetchedRecords:
+    """Records fetched on a worker thread and consumed, in order, on another one.
+
+    The buffer is bounded, so a producer that runs ahead blocks instead of holding a
+    whole partition in memory. `cancel` releases a blocked producer when the
+    consumer gives up early.
+    """
+
+    def __init__(self, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self._queue: "queue.Queue[Any]" = queue.Queue(buffer_size)
+        self._cancelled = threading.Event()
+
+    def produce(self, records: Iterable[dict]) -> None:
+        """Drain `records` into the buffer; errors are re-raised to the consumer."""
+        if self._cancelled.is_set():
+            return
+        try:
+            for record in records:
+                if not self._put(record):
+                    return
+        except Exception as e:
+            self._put(_Failure(e))
+            return
+        self._put(_DONE)
+
+    def _put(self, item: Any) -> bool:
+        while not self._cancelled.is_set():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def __iter__(self) -> Iterator[dict]:
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
@@ -0,0 +1,152 @@
+"""Opt-in cProfile and tracemalloc profiling of selected streams."""
+
+import cProfile
+import fnmatch
+import json
+import os
+import pstats
+import random
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, List, Optional, Sequence
+
+ENV_DIR = "TAP_KLAVIYO_PROFILE_DIR"
+ENV_STREAMS = "TAP_KLAVIYO_PROFILE_STREAMS"
+ENV_SAMPLE_RATE = "TAP_KLAVIYO_PROFILE_SAMPLE_RATE"
+# allocation sites listed in each memory report
+TOP_ALLOCATIONS = 25
+
+
+class StreamProfiler:
+    """Profile selected streams and write one dump per stream to a directory.
+
+    Each stream is profiled in a run with probability `sample_rate`, decided once
+    per stream, so a low rate keeps the overhead of scheduled runs down. Work done
+    for a stream on prefetch threads is profiled too, and when a parent syncs a
+    child on the same thread, the parent's profile is paused meanwhile so each
+    dump only holds its own stream's time.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str],
+        streams: Sequence[str] = ("*",),
+        sample_rate: float = 1.0,
+        rng: Callable[[], float] = random.random,
+    ):
+        self.directory = directory
+        self.patterns = list(streams) or ["*"]
+        self.sample_rate = sample_rate
+        self._rng = rng
+        self._sampled: Dict[str, bool] = {}
+        self._stats: Dict[str, pstats.Stats] = {}
+        self._peaks: Dict[str, int] = {}
+        self._allocations: Dict[str, List[dict]] = {}
+        self._running = 0
+        self._active = threading.local()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "StreamProfiler":
+        """Build the profiler from the tap config, or the environment if unset there."""
+        directory = config.get("profile_dir") or os.environ.get(ENV_DIR)
+        streams = config.get("profile_streams")
+        if streams is None:
+            streams = [s for s in os.environ.get(ENV_STREAMS, "*").split(",") if s.strip()]
+        sample_rate = config.get("profile_sample_rate")
+        if sample_rate is None:
+            sample_rate = os.environ.get(ENV_SAMPLE_RATE, 1.0)
+        return cls(directory, [s.strip() for s in streams], float(sample_rate))
+
+    def is_profiled(self, stream_name: str) -> bool:
+        if not self.directory:
+            return False
+        with self._lock:
+            if stream_name not in self._sampled:
+                self._sampled[stream_name] = any(
+                    fnmatch.fnmatchcase(stream_name, pattern) for pattern in self.patterns
+                ) and self._rng() < self.sample_rate
+            return self._sampled[stream_name]
+
+    def profile(self, stream_name: str):
+        """Return a context manager profiling the enclosed work for `stream_name`."""
+        if not self.is_profiled(stream_name):
+            return nullcontext()
+        return self._profile(stream_name)
+
+    def wrap(self, stream_name: str, func: Callable) -> Callable:
+        """Return `func` profiled for `stream_name`, to run on another thread."""
+        if not self.is_profiled(stream_name):
+            return func
+
+        def profiled(*args, **kwargs):
+            with self._profile(stream_name):
+                return func(*args, **kwargs)
+
+        return profiled
+
+    @contextmanager
+    def _profile(self, stream_name: str):
+        with self._lock:
+            # memory is traced only while a profiled stream runs
+            if not self._running:
+                tracemalloc.start()
+            self._running += 1
+        stack = self._active.__dict__.setdefault("stack", [])
+        if stack:
+            stack[-1].disable()
+        profile = cProfile.Profile()
+        stack.append(profile)
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            stack.pop()
+            if stack:
+                stack[-1].enable()
+            with self._lock:
+                # merged right away, child streams are profiled once per parent record
+                if stream_name in self._stats:
+                    self._stats[stream_name].add(profile)
+                else:
+                    self._stats[stream_name] = pstats.Stats(profile)
+                peak = tracemalloc.get_traced_memory()[1]
+                self._peaks[stream_name] = max(self._peaks.get(stream_name, 0), peak)
+                self._running -= 1
+                if not self._running:
+                    self._allocations[stream_name] = [
+                        {"location": str(stat.traceback), "bytes": stat.size, "count": stat.count}
+                        for stat in tracemalloc.take_snapshot().statistics("lineno")[:TOP_ALLOCATIONS]
+                    ]
+                    tracemalloc.stop()
+
+    def dump(self, stream_names: Sequence[str]) -> None:
+        """Write the profiles and memory high-water marks collected for `stream_names`.
+
+        `<stream>.prof` can be read with `python -m pstats` or snakeviz.
+        `<stream>.memory.json` has the peak traced memory while the stream ran,
+        which includes streams profiled at the same time, and for the outermost
+        stream the largest allocation sites still alive when it finished.
+        """
+        with self._lock:
+            collected = {
+                name: (
+                    self._stats.pop(name),
+                    self._peaks.pop(name, 0),
+                    self._allocations.pop(name, None),
+                )
+                for name in stream_names
+                if name in self._stats
+            }
+        if not collected:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        for name, (stats, peak, allocations) in collected.items():
+            stats.dump_stats(os.path.join(self.directory, f"{name}.prof"))
+            memory = {"stream": name, "peak_traced_bytes": peak}
+            if allocations is not None:
+                memory["top_allocations"] = allocations
+            with open(os.path.join(self.directory, f"{name}.memory.json"), "w") as f:
+                json.dump(memory, f, indent=2)
@@ -0,0 +1,149 @@
+"""Proactive, per-endpoint pacing of Klaviyo API requests."""
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import backoff
+import requests
+
+
+def parse_rate_limit_policies(value: Optional[str]) -> List[Tuple[int, float]]:
+    """Parse a `RateLimit-Limit` header into (quota, window seconds) policies.
+
+    Accepts both a bare quota ("10", treated as per second) and the draft
+    IETF policy form ("10, 10;w=1, 150;w=60").
+    """
+    if not value:
+        return []
+    policies = []
+    first_quota = None
+    for part in value.split(","):
+        items = [item.strip() for item in part.split(";")]
+        try:
+            quota = int(items[0])
+        except ValueError:
+            continue
+        if first_quota is None:
+            first_quota = quota
+        for item in items[1:]:
+            if item.startswith("w="):
+                try:
+                    policies.append((quota, float(item[2:])))
+                except ValueError:
+                    pass
+    if not policies and first_quota is not None:
+        policies.append((first_quota, 1.0))
+    return policies
+
+
+def _parse_seconds(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """Token bucket holding up to `capacity` tokens, refilled at `rate` per second.
+
+    Tokens may go negative so that concurrent callers queue up behind each other.
+    """
+
+    def __init__(self, capacity: float, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = now
+
+    def reserve(self, now: float) -> float:
+        """Take a token and return how long the caller must wait for it."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class EndpointLimit:
+    """Pacing state for a single endpoint."""
+
+    def __init__(self):
+        self.policies: List[Tuple[int, float]] = []
+        self.buckets: List[TokenBucket] = []
+        self.blocked_until = 0.0
+
+
+class RateLimiter:
+    """Pace requests per endpoint from Klaviyo's `RateLimit-*` and `Retry-After` headers.
+
+    Buckets are sized from the advertised burst and steady policies scaled by
+    `headroom`, so requests stay just under the limits instead of hitting 429s.
+    """
+
+    def __init__(self, headroom: float = 0.9, clock=time.monotonic, sleep=time.sleep):
+        self.headroom = headroom
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, EndpointLimit] = {}
+        self._local = threading.local()
+
+    def _endpoint(self, key: str) -> EndpointLimit:
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            endpoint = self._endpoints[key] = EndpointLimit()
+        return endpoint
+
+    def acquire(self, key: str) -> float:
+        """Block until a request to `key` may be sent; return the time waited."""
+        with self._lock:
+            endpoint = self._endpoint(key)
+            now = self._clock()
+            wait = max(0.0, endpoint.blocked_until - now)
+            for bucket in endpoint.buckets:
+                wait = max(wait, bucket.reserve(now))
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    def update(self, key: str, response: requests.Response) -> None:
+        """Learn the endpoint limits and remaining quota from a response."""
+        headers = response.headers
+        policies = parse_rate_limit_policies(headers.get("RateLimit-Limit"))
+        remaining = _parse_seconds(headers.get("RateLimit-Remaining"))
+        reset = _parse_seconds(headers.get("RateLimit-Reset"))
+        retry_after = _parse_seconds(headers.get("Retry-After"))
+        with self._lock:
+            endpoint = self._endpoint(key)
+            now = self._clock()
+            if policies and policies != endpoint.policies:
+                endpoint.policies = policies
+                endpoint.buckets = [
+                    TokenBucket(
+                        capacity=max(1.0, quota * self.headroom),
+                        rate=max(quota * self.headroom, 1e-3) / window,
+                        now=now,
+                    )
+                    for quota, window in policies
+                ]
+            if remaining is not None and remaining <= 0 and reset:
+                endpoint.blocked_until = max(endpoint.blocked_until, now + reset)
+            if response.status_code == 429:
+                delay = retry_after if retry_after is not None else reset
+                if delay is not None:
+                    endpoint.blocked_until = max(endpoint.blocked_until, now + delay)
+                    self._local.throttled = True
+
+    def pop_throttled(self) -> bool:
+        """Return whether this thread's last 429 is already being waited out."""
+        throttled = getattr(self._local, "throttled", False)
+        self._local.throttled = False
+        return throttled
+
+
+def expo_unless_throttled(rate_limiter: RateLimiter, factor: float = 1):
+    """Exponential backoff that skips the delay when the limiter already waits out a 429."""
+    for delay in backoff.expo(factor=factor):
+        yield 0 if rate_limiter.pop_throttled() else delay
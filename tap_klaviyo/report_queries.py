@@ -0,0 +1,121 @@
+"""Metric aggregates queries shared by report streams."""
+
+import json
+import tempfile
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+import requests
+
+
+def query_signature(stream) -> Tuple:
+    """Return what makes two report streams send the same queries."""
+    return (
+        stream.metric_id,
+        tuple(sorted(stream.aggregation_types)),
+        tuple(stream.dimensions),
+        stream.interval,
+    )
+
+
+def query_key(payload: Any) -> str:
+    """Return a canonical key for a metric aggregates request body."""
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8")
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+    attributes = dict(payload["data"]["attributes"])
+    attributes["measurements"] = sorted(attributes.get("measurements", []))
+    return json.dumps(attributes, sort_keys=True)
+
+
+class ReportQueryPlan:
+    """Run each unique metric aggregates query once for all report streams needing it.
+
+    Streams are grouped by `query_signature`. Every stream of a group queries the
+    same range, from the earliest bookmark of the group to a shared end date, so
+    they send the same windows and pages; each stream drops the rows before its own
+    bookmark. The first stream of a group to send a query (same window and page
+    cursor) keeps the response for the other streams of the group, which read it
+    instead of calling the API. A response is dropped once every stream of the
+    group has read it.
+    """
+
+    def __init__(self, streams: List[Any]):
+        groups: Dict[Tuple, List[Any]] = {}
+        for stream in streams:
+            groups.setdefault(query_signature(stream), []).append(stream)
+        self._groups = {signature: group for signature, group in groups.items() if len(group) > 1}
+        self._sharers = {signature: len(group) for signature, group in self._groups.items()}
+        self._ranges: Dict[Tuple, Tuple[datetime, datetime]] = {}
+        self._responses: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        self.requests_saved = 0
+
+    @property
+    def shared_queries(self) -> int:
+        return len(self._sharers)
+
+    def handles(self, stream) -> bool:
+        """Return True if another selected stream sends the same queries."""
+        return query_signature(stream) in self._sharers
+
+    def report_range(self, stream) -> Tuple[datetime, datetime]:
+        """Return the range every stream sharing the queries of `stream` syncs.
+
+        It is fixed when the first stream of the group asks, before any bookmark
+        of the group has moved.
+        """
+        signature = query_signature(stream)
+        with self._lock:
+            if signature not in self._ranges:
+                group = self._groups[signature]
+                end_date = max(sharer.end_date for sharer in group)
+                start_date = min(
+                    sharer.get_stream_report_range(None, end_date)[0] for sharer in group
+                )
+                self._ranges[signature] = (start_date, end_date)
+            return self._ranges[signature]
+
+    def fetch(self, stream, payload: Any, send: Callable[[], requests.Response]) -> requests.Response:
+        """Return the response for `payload`, calling `send` only on the first request.
+
+        Streams sync one after another, so the body kept for the other streams of
+        the group is spooled to a temporary file rather than held in memory.
+        """
+        key = query_key(payload)
+        with self._lock:
+            entry = self._responses.get(key)
+            if entry is not None:
+                response, spool = entry[0], entry[2]
+                spool.seek(0)
+                replay = _copy_response(response, spool.read())
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._responses[key]
+                    spool.close()
+                self.requests_saved += 1
+                return replay
+        response = send()
+        # closed by the last sharer to read it
+        spool = tempfile.TemporaryFile()  # noqa: SIM115
+        spool.write(response.content)
+        with self._lock:
+            self._responses[key] = [
+                _copy_response(response, b""),
+                self._sharers[query_signature(stream)] - 1,
+                spool,
+            ]
+        return response
+
+
+def _copy_response(response: requests.Response, content: bytes) -> requests.Response:
+    """Return a response with the status and headers of `response` and the body `content`."""
+    copy = requests.Response()
+    copy.status_code = response.status_code
+    copy.headers = response.headers
+    copy.url = response.url
+    copy.encoding = response.encoding
+    copy._content = content
+    return copy
@@ -0,0 +1,90 @@
+"""Persistent cache of discovered stream schemas."""
+
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from tap_klaviyo.files import write_json_atomic
+
+DEFAULT_TTL = 24 * 60 * 60
+CACHE_VERSION = 1
+
+
+def account_key(config: Mapping[str, Any]) -> Optional[str]:
+    """Return a stable, non-secret identifier for the Klaviyo account in `config`.
+
+    An OAuth client id identifies the app rather than the account, so with OAuth
+    the account is only known from `account_id`; None is returned without it.
+    """
+    if config.get("account_id"):
+        return str(config["account_id"])
+    api_key = config.get("api_private_key") or config.get("api_key")
+    if not api_key:
+        return None
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+class SchemaCache:
+    """On-disk schema cache keyed by account, API revision and stream name.
+
+    Entries older than `ttl` seconds are sampled again, unless `incremental` is set,
+    in which case only streams missing from the cache (e.g. new metrics) are sampled.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        account: str,
+        ttl: float = DEFAULT_TTL,
+        incremental: bool = False,
+        clock=time.time,
+    ):
+        self.path = path
+        self.account = account
+        self.ttl = ttl
+        self.incremental = incremental
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._entries: Dict[str, dict] = self._load()
+
+    def _load(self) -> Dict[str, dict]:
+        try:
+            with open(self.path) as cache_file:
+                data = json.load(cache_file)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != CACHE_VERSION:
+            return {}
+        return data.get("entries", {})
+
+    def _key(self, stream_name: str, revision: str) -> str:
+        return f"{self.account}/{revision}/{stream_name}"
+
+    def get(self, stream_name: str, revision: str) -> Optional[dict]:
+        """Return the cached schema, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(self._key(stream_name, revision))
+        if not entry:
+            return None
+        if not self.incremental and self._clock() - entry["fetched_at"] > self.ttl:
+            return None
+        return entry["schema"]
+
+    def put(self, stream_name: str, revision: str, schema: dict) -> None:
+        with self._lock:
+            self._entries[self._key(stream_name, revision)] = {
+                "fetched_at": self._clock(),
+                "schema": schema,
+            }
+            self._dirty = True
+
+    def save(self) -> None:
+        """Write the cache atomically if anything changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            write_json_atomic(self.path, {"version": CACHE_VERSION, "entries": self._entries})
+            self._dirty = False
@@ -0,0 +1,66 @@
+"""Process-wide pooled HTTP session shared by discovery, auth and sync."""
+
+import socket
+import threading
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+DEFAULT_POOL_SIZE = 20
+
+# one session per (pool size, keep-alive) pair, so a changed config gets its own pool
+_sessions: Dict[Tuple[int, bool], requests.Session] = {}
+_session_lock = threading.Lock()
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """HTTP adapter whose pooled sockets use TCP keep-alive."""
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        kwargs["socket_options"] = HTTPConnection.default_socket_options + [
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+        ]
+        super().init_poolmanager(*args, **kwargs)
+
+
+def build_session(pool_size: int = DEFAULT_POOL_SIZE, keep_alive: bool = True) -> requests.Session:
+    """Build a session with a connection pool sized for the tap's concurrency."""
+    session = requests.Session()
+    adapter_class = KeepAliveAdapter if keep_alive else HTTPAdapter
+    adapter = adapter_class(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+
+def pool_settings(config: Optional[Mapping[str, Any]] = None) -> Tuple[int, bool]:
+    """Return the `(pool_size, keep_alive)` pair configured by `config`."""
+    config = config or {}
+    keep_alive = config.get("http_keep_alive")
+    return (
+        int(config.get("http_pool_size") or DEFAULT_POOL_SIZE),
+        True if keep_alive is None else bool(keep_alive),
+    )
+
+
+def get_session(config: Optional[Mapping[str, Any]] = None) -> requests.Session:
+    """Return the process-wide session for the pool settings in `config`.
+
+    Honours `http_pool_size` and `http_keep_alive`; callers with the same settings
+    share one session.
+    """
+    settings = pool_settings(config)
+    session = _sessions.get(settings)
+    if session is None:
+        with _session_lock:
+            session = _sessions.get(settings)
+            if session is None:
+                pool_size, keep_alive = settings
+                session = _sessions[settings] = build_session(
+                    pool_size=pool_size, keep_alive=keep_alive
+                )
+    return session
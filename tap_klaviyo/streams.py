@@ -1,17 +1,38 @@
 """Stream type classes for tap-klaviyo."""
 
-from typing import Any, Dict, Optional, List
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Optional, List, Tuple
 from urllib.parse import urlencode
 from tap_klaviyo.client import KlaviyoStream
+from tap_klaviyo.decoding import response_json
+from tap_klaviyo.prefetch import PrefetchedRecords
+from tap_klaviyo.transform import DATETIME_FORMAT, parse_datetime
 from hotglue_singer_sdk import typing as th
 from datetime import datetime, timedelta, timezone
 from pendulum import parse
 
+# longest span of one metric aggregates bucket per interval
+INTERVAL_LENGTHS = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(days=7),
+    "month": timedelta(days=31),
+}
+# profile attributes merged into events by default when sideloading profiles
+DEFAULT_EVENT_PROFILE_FIELDS = ["email", "phone_number", "external_id", "first_name", "last_name"]
+
+
 def _as_utc(dt: datetime) -> datetime:
     """Return a timezone-aware UTC datetime."""
     if dt.tzinfo is None:
-        return dt.replace(tzinfo=timezone.utc)
-    return dt.astimezone(timezone.utc)
+        dt = dt.replace(tzinfo=timezone.utc)
+    dt = dt.astimezone(timezone.utc)
+    # a plain datetime: pendulum datetimes break on arithmetic once given a stdlib tz
+    return datetime(
+        dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second, dt.microsecond,
+        tzinfo=timezone.utc,
+    )
 
 class ContactsStream(KlaviyoStream):
     """Define custom stream."""
@@ -25,6 +46,18 @@ class ContactsStream(KlaviyoStream):
     name = "contacts"
     path = "/profiles"
     primary_keys = ["id"]
+    resource_type = "profile"
+    max_page_size = 100
+    sortable = True
+
+    @property
+    def parallelization_limit(self) -> int:
+        """Number of time slices fetched concurrently."""
+        return int(self.config.get("contacts_max_workers") or 1)
+
+    def get_paging_windows(self, context: Optional[dict]) -> List[Dict[str, Any]]:
+        """Split a backfill into time slices when `contacts_slice_days` is set."""
+        return self.get_time_slices(context, self.config.get("contacts_slice_days"))
 
 
 class ListsStream(KlaviyoStream):
@@ -33,6 +66,7 @@ class ListsStream(KlaviyoStream):
     name = "lists"
     path = "/lists"
     primary_keys = ["id"]
+    resource_type = "list"
     replication_key = "updated"
 
     def get_child_context(self, record, context):
@@ -45,6 +79,7 @@ class MetricsStream(KlaviyoStream):
     name = "metrics"
     path = "/metrics"
     primary_keys = ["id"]
+    resource_type = "metric"
     replication_key = None
 
 
@@ -54,7 +89,17 @@ class EventsStream(KlaviyoStream):
     name = "events"
     path = "/events"
     primary_keys = ["id"]
+    resource_type = "event"
     replication_key = "datetime"
+    metric_id: Optional[str] = None
+    # related resources that can be merged into each event with include=
+    derived_properties = ("profile", "metric")
+
+    @property
+    def sortable(self) -> bool:
+        # records read from the single-pass scan are not paged by this stream
+        demultiplexer = self._tap.events_demultiplexer
+        return demultiplexer is None or not demultiplexer.handles(self)
 
     def get_url_params(
             self, context: Optional[dict], next_page_token: Optional[Any]
@@ -62,9 +107,77 @@ class EventsStream(KlaviyoStream):
         """Return a dictionary of values to be used in URL parameterization."""
         params = super().get_url_params(context, next_page_token)
         # add filter to get only events for a metric
-        if self.name != "events":
-            params["filter"] = f"equals(metric_id,'{self.metric_id}')"
+        if self.name != "events" and not (context or {}).get("all_metrics"):
+            metric_filter = f"equals(metric_id,'{self.metric_id}')"
+            time_filter = params.get("filter")
+            if not time_filter:
+                params["filter"] = metric_filter
+            elif time_filter.startswith("and("):
+                params["filter"] = f"and({metric_filter},{time_filter[len('and('):]}"
+            else:
+                params["filter"] = f"and({metric_filter},{time_filter})"
+        if (context or {}).get("all_metrics"):
+            # the shared scan feeds streams that may select different fields
+            params.pop(f"fields[{self.resource_type}]", None)
+        included = self.get_included_resources(context)
+        if included:
+            params["include"] = ",".join(included)
+            if "profile" in included:
+                params["fields[profile]"] = ",".join(self.profile_fields)
+            if "metric" in included:
+                params["fields[metric]"] = "name"
         return params
+
+    @property
+    def sideload_resources(self) -> bool:
+        """Whether profile and metric attributes are merged into events with include=."""
+        return bool(self.config.get("sideload_event_resources"))
+
+    @property
+    def profile_fields(self) -> List[str]:
+        return list(self.config.get("event_profile_fields") or DEFAULT_EVENT_PROFILE_FIELDS)
+
+    def get_included_resources(self, context: Optional[dict]) -> List[str]:
+        """Return the related resources to request, skipping those deselected in the catalog."""
+        if not self.sideload_resources:
+            return []
+        if (context or {}).get("all_metrics") or self._tap.input_catalog is None:
+            return list(self.derived_properties)
+        return [name for name in self.derived_properties if self.mask[("properties", name)]]
+
+    @property
+    def streaming_json(self) -> bool:
+        # the included resources follow the records
+        return super().streaming_json and not self.sideload_resources
+
+    def parse_response(self, response) -> Iterable[dict]:
+        if not self.sideload_resources:
+            yield from super().parse_response(response)
+            return
+        # lookup of this page's included resources
+        included = {
+            (item.get("type"), item.get("id")): item
+            for item in response_json(response).get("included") or []
+        }
+        for record in super().parse_response(response):
+            relationships = record.get("relationships") or {}
+            for name in self.derived_properties:
+                related = (relationships.get(name) or {}).get("data")
+                item = included.get((name, related.get("id"))) if related else None
+                if item is not None:
+                    record[name] = {"id": item["id"], **(item.get("attributes") or {})}
+            yield record
+
+    def get_records(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        """Return records, reading from the shared single-pass scan when enabled."""
+        demultiplexer = self._tap.events_demultiplexer
+        if demultiplexer is None or not demultiplexer.handles(self):
+            yield from super().get_records(context)
+            return
+        for record in demultiplexer.records_for(self):
+            transformed = self.post_process(record, context)
+            if transformed is not None:
+                yield transformed
     
     def get_schema(self):
         schema = super().get_schema()
@@ -104,6 +217,28 @@ class EventsStream(KlaviyoStream):
                 th.Property("uuid", th.StringType),
             ).to_dict()
         return schema
+
+    def _get_cached_schema(self) -> dict:
+        # added after the discovery cache, which does not depend on the config
+        schema = super()._get_cached_schema()
+        if not self.sideload_resources:
+            return schema
+        sideloaded = th.PropertiesList(
+            th.Property("profile", th.ObjectType(
+                th.Property("id", th.StringType),
+                *[
+                    th.Property(name, th.StringType)
+                    if name in DEFAULT_EVENT_PROFILE_FIELDS
+                    else th.Property(name, self._unknown_jsonschema_type())
+                    for name in self.profile_fields
+                ],
+            )),
+            th.Property("metric", th.ObjectType(
+                th.Property("id", th.StringType),
+                th.Property("name", th.StringType),
+            )),
+        ).to_dict()["properties"]
+        return dict(schema, properties={**schema.get("properties", {}), **sideloaded})
     
 
 class ListMembersStream(KlaviyoStream):
@@ -112,6 +247,8 @@ class ListMembersStream(KlaviyoStream):
     name = "list_members"
     path = "/lists/{id}/profiles"
     primary_keys = ["id"]
+    resource_type = "profile"
+    max_page_size = 100
     replication_key = "joined_group_at"
     parent_stream_type = ListsStream
 
@@ -122,6 +259,8 @@ class CampaignsStream(KlaviyoStream):
     name = "campaigns"
     path = "/campaigns"
     primary_keys = ["id"]
+    resource_type = "campaign"
+    derived_properties = ("channel",)
     replication_key = "updated_at"
     channels = ("email", "sms")
 
@@ -164,13 +303,68 @@ class CampaignsStream(KlaviyoStream):
                 )
         else:
             params["filter"] = channel_filter
+        if self.sideload_messages:
+            # sparse fieldsets could drop the relationships the sideload relies on
+            params["include"] = "campaign-messages"
+        else:
+            params.update(self.get_sparse_fieldset_params())
         return params
 
-    def get_data(self, method: str, url: str, headers: dict) -> list:
+    @property
+    def campaign_messages_stream(self) -> Optional["CampaignMessagesStream"]:
+        """The selected campaign_messages child stream, if any."""
+        return next(
+            (
+                stream
+                for stream in self.child_streams
+                if isinstance(stream, CampaignMessagesStream)
+                and (stream.selected or stream.has_selected_descendents)
+            ),
+            None,
+        )
+
+    @property
+    def sideload_messages(self) -> bool:
+        """Whether campaign messages are fetched with include= instead of per campaign."""
+        return (
+            bool(self.config.get("sideload_campaign_messages"))
+            and self.campaign_messages_stream is not None
+        )
+
+    @property
+    def streaming_json(self) -> bool:
+        # the sideloaded messages live in "included", after the records
+        return super().streaming_json and not self.sideload_messages
+
+    def parse_response(self, response) -> Iterable[dict]:
+        if self.sideload_messages:
+            self._sideload_campaign_messages(response_json(response))
+        yield from super().parse_response(response)
+
+    def _sideload_campaign_messages(self, body: dict) -> None:
+        """Hand the included messages of each campaign on the page to the child stream."""
+        included = {
+            item["id"]: item
+            for item in body.get("included") or []
+            if item.get("type") == "campaign-message"
+        }
+        for campaign in body.get("data") or []:
+            relationship = (campaign.get("relationships") or {}).get("campaign-messages") or {}
+            related = relationship.get("data")
+            if related is None:
+                continue
+            messages = [included[item["id"]] for item in related if item["id"] in included]
+            # fall back to the per-campaign request if anything is missing
+            if len(messages) == len(related):
+                self.campaign_messages_stream.sideload(campaign["id"], messages)
+
+    def get_data_page(
+        self, method: str, url: str, headers: dict
+    ) -> Tuple[List[dict], Optional[str]]:
         """Fetch sample records for schema discovery with a channel filter."""
         params = {"filter": self._channel_filter(self.channels[0])}
         url = f"{url}?{urlencode(params)}"
-        return super().get_data(method, url, headers)
+        return super().get_data_page(method, url, headers)
 
     def get_schema(self) -> dict:
         schema = super().get_schema()
@@ -197,9 +391,30 @@ class CampaignMessagesStream(KlaviyoStream):
     name = "campaign_messages"
     path = "/campaigns/{id}/campaign-messages"
     primary_keys = ["id"]
+    resource_type = "campaign-message"
+    derived_properties = ("campaign_id", "template_id")
     replication_key = None
     parent_stream_type = CampaignsStream
 
+    def __init__(self, tap):
+        # campaign id -> messages included in the parent campaigns response
+        self._sideloaded: Dict[str, List[dict]] = {}
+        super().__init__(tap=tap)
+
+    def sideload(self, campaign_id: str, messages: List[dict]) -> None:
+        """Store messages sideloaded by the parent so they need no request of their own."""
+        self._sideloaded[campaign_id] = messages
+
+    def get_records(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        messages = self._sideloaded.pop((context or {}).get("id"), None)
+        if messages is None:
+            yield from super().get_records(context)
+            return
+        for message in messages:
+            transformed = self.post_process(message, context)
+            if transformed is not None:
+                yield transformed
+
     def get_url_params(
         self, context: Optional[dict], next_page_token: Optional[Any]
     ) -> Dict[str, Any]:
@@ -207,9 +422,12 @@ class CampaignMessagesStream(KlaviyoStream):
         params: dict = {}
         if next_page_token:
             params["page[cursor]"] = next_page_token
+        params.update(self.get_sparse_fieldset_params())
         return params
 
-    def get_data(self, method: str, url: str, headers: dict) -> list:
+    def get_data_page(
+        self, method: str, url: str, headers: dict
+    ) -> Tuple[List[dict], Optional[str]]:
         """Fetch parent campaign id for schema discovery with a channel filter."""
         if url.rstrip("/").endswith(self.parent_stream_type.path):
             parent = self.parent_stream_type(tap=self._tap)
@@ -217,7 +435,7 @@ class CampaignMessagesStream(KlaviyoStream):
                 "filter": parent._channel_filter(self.parent_stream_type.channels[0])
             }
             url = f"{url}?{urlencode(params)}"
-        return super().get_data(method, url, headers)
+        return super().get_data_page(method, url, headers)
 
     def get_schema(self) -> dict:
         schema = super().get_schema()
@@ -245,6 +463,7 @@ class TemplatesStream(KlaviyoStream):
     name = "templates"
     path = "/templates"
     primary_keys = ["id"]
+    resource_type = "template"
     replication_key = "updated"
 
 
@@ -254,6 +473,8 @@ class ReviewsStream(KlaviyoStream):
     name = "reviews"
     path = "/reviews"
     primary_keys = ["id"]
+    resource_type = "review"
+    max_page_size = 100
     replication_key = "created"
 
     def get_url_params(
@@ -267,11 +488,18 @@ class ReviewsStream(KlaviyoStream):
             if self.replication_key and start_date:
                 start_date = start_date.strftime("%Y-%m-%dT%H:%M:%SZ")
                 params["filter"] = f"greater-or-equal({self.replication_key},{start_date})"
+            params.update(self.get_sparse_fieldset_params())
             return params
 
 class ReportStream(KlaviyoStream):
     """Report stream for metric aggregates using Klaviyo's Query Metric Aggregates API."""
     page_size = 500
+    # the schema is built from the report config, there is nothing to sample
+    cache_schema = False
+    # metric aggregates are a single document, not a data[*] list
+    supports_streaming_json = False
+    # Klaviyo API: maximum time range of a single query is 1 year
+    max_window_days = 365
 
     def __init__(self, tap, report_config: Dict[str, Any]):
         """Initialize report stream with configuration."""
@@ -305,12 +533,19 @@ class ReportStream(KlaviyoStream):
         """Return empty params since we use POST body."""
         return {}
 
-    def prepare_request_payload(
-        self, context: Optional[dict], next_page_token: Optional[Any]
-    ) -> Optional[dict]:
-        """Prepare the request payload for the metric aggregates API."""
+    def get_report_range(self, context: Optional[dict]) -> Tuple[datetime, datetime]:
+        """Return the (start, end) range to sync, before it is split into windows."""
+        plan = self._tap.report_query_plan
+        if plan is not None and plan.handles(self):
+            return plan.report_range(self)
+        return self.get_stream_report_range(context)
+
+    def get_stream_report_range(
+        self, context: Optional[dict], end_date: Optional[datetime] = None
+    ) -> Tuple[datetime, datetime]:
+        """Return the range this stream's own bookmark needs, ending at `end_date`."""
         # Resolve end_date first (config takes precedence), then normalize to UTC
-        end_date = self.end_date
+        end_date = end_date or self.end_date
 
         # Start date: use bookmark if present; otherwise default to a recent window (7 days)
         start_date = self.get_starting_time(context)
@@ -325,12 +560,101 @@ class ReportStream(KlaviyoStream):
                 "falling back to last 7 days."
             )
             start_date = end_date - timedelta(days=7)
+        return start_date, end_date
+
+    def _get_window_end(self, window_start: datetime) -> datetime:
+        """End of the window starting at `window_start`, on an interval boundary.
+
+        Windows never split a week or month bucket, which would otherwise be
+        emitted twice with partial values.
+        """
+        if self.interval == "month":
+            month = window_start.month - 1 + 11
+            return window_start.replace(
+                year=window_start.year + month // 12, month=month % 12 + 1,
+                day=1, hour=0, minute=0, second=0, microsecond=0,
+            )
+        days = 364 if self.interval == "week" else self.max_window_days
+        window_end = window_start + timedelta(days=days)
+        return window_end.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def get_report_windows(self, context: Optional[dict]) -> List[Dict[str, datetime]]:
+        """Split the report range into consecutive windows the API accepts."""
+        start_date, end_date = self.get_report_range(context)
+        windows = []
+        window_start = start_date
+        while window_start < end_date:
+            window_end = min(self._get_window_end(window_start), end_date)
+            windows.append({"window_start": window_start, "window_end": window_end})
+            window_start = window_end
+        return windows
+
+    def get_records(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        """Query the windows, concurrently if enabled, and emit them in date order.
+
+        A resumable STATE is written after each window, so the `date` bookmark
+        advances window by window during long backfills.
+        """
+        windows = self.get_report_windows(context)
+        keep = self._get_row_filter(context, windows)
+        max_workers = min(int(self.config.get("report_max_workers") or 1), len(windows))
+        with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+            prefetched = []
+            for window in windows:
+                records = PrefetchedRecords()
+                window_context = dict(context or {}, **window)
+                produce = self._tap.profiler.wrap(self.name, records.produce)
+                executor.submit(produce, self._get_records_for_window(window_context))
+                prefetched.append(records)
+            try:
+                for index, records in enumerate(prefetched):
+                    if index:
+                        self._write_window_state()
+                    yield from filter(keep, records) if keep else records
+            finally:
+                for records in prefetched:
+                    records.cancel()
+
+    def _get_row_filter(
+        self, context: Optional[dict], windows: List[Dict[str, datetime]]
+    ) -> Optional[Callable[[dict], bool]]:
+        """Return a filter dropping rows before this stream's bookmark, if the range starts earlier.
+
+        Shared queries start at the earliest bookmark of the streams sending them.
+        The bucket holding the bookmark is kept, as it is when querying alone.
+        """
+        if not windows:
+            return None
+        start_date = self.get_stream_report_range(context, windows[-1]["window_end"])[0]
+        if start_date <= windows[0]["window_start"]:
+            return None
+        since = (start_date - INTERVAL_LENGTHS.get(self.interval, timedelta())).strftime(DATETIME_FORMAT)
+        return lambda record: record["date"] > since
+
+    def _request(self, prepared_request, context: Optional[dict]):
+        """Send the query, or reuse the response of a report with the same query."""
+        plan = self._tap.report_query_plan
+        if plan is None or not plan.handles(self):
+            return super()._request(prepared_request, context)
+        return plan.fetch(self, prepared_request.body, partial(super()._request, prepared_request, context))
+
+    def _write_window_state(self) -> None:
+        self.__dict__["_window_complete"] = True
+        try:
+            self._write_state_message()
+        finally:
+            self.__dict__["_window_complete"] = False
+
+    def _emits_resumable_interim_state(self) -> bool:
+        # every earlier window has been emitted, so the bookmark is safe to resume from
+        return self.__dict__.get("_window_complete", False) or super()._emits_resumable_interim_state()
 
-        # Klaviyo API: maximum time range is 1 year
-        one_year_ago = end_date - timedelta(days=365)
-        if start_date < one_year_ago:
-            self.logger.warning(f"Limited date range to 1 year for report stream {self.name}")
-            start_date = one_year_ago
+    def prepare_request_payload(
+        self, context: Optional[dict], next_page_token: Optional[Any]
+    ) -> Optional[dict]:
+        """Prepare the request payload for the metric aggregates API."""
+        window = context if context and "window_start" in context else self.get_report_windows(context)[0]
+        start_date, end_date = window["window_start"], window["window_end"]
 
         # Format as ISO8601 without microseconds, with 'Z'
         start_date_str = start_date.replace(microsecond=0).isoformat().replace("+00:00", "Z")
@@ -382,46 +706,38 @@ class ReportStream(KlaviyoStream):
         
         return th.PropertiesList(*properties).to_dict()
 
-    def parse_response(self, response) -> List[Dict[str, Any]]:
-        """Parse the response from the metric aggregates API."""
-        data = response.json()
-        results = []
-        
+    def parse_response(self, response) -> Iterable[Dict[str, Any]]:
+        """Parse the response from the metric aggregates API, one record at a time.
+
+        The shared `dates` array is formatted once and each data point's
+        measurements are read column by column.
+        """
+        data = response_json(response)
+
         # Extract data from the response
-        if "data" in data and "attributes" in data["data"]:
-            attributes = data["data"]["attributes"]
-            dates = attributes.get("dates", [])
-            data_points = attributes.get("data", [])
-            
-            # Process each data point
-            for item in data_points:
-                # Get dimensions array
-                dimensions = item.get("dimensions", [])
-                measurements = item.get("measurements", {})
-                
-                # Create a record for each date
-                for index, date_str  in enumerate(dates):
-                    formatted_date = parse(date_str).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-                    record = {
-                        "date": formatted_date,
-                        "metric_id": self.metric_id,
-                    }
-                    
-                    # Add dimension values
-                    for i, dimension in enumerate(self.dimensions):
-                        if i < len(dimensions):
-                            record[dimension] = dimensions[i]
-                        else:
-                            record[dimension] = None
-                    
-                    # Add metric values
-                    for agg_type in self.aggregation_types:
-                        metric_values = measurements.get(agg_type, [])
-                        if metric_values and len(metric_values) > index:
-                            record[agg_type] = metric_values[index]
-                        else:
-                            record[agg_type] = None
-                    
-                    results.append(record)
-        
-        return results
+        if "data" not in data or "attributes" not in data["data"]:
+            return
+        attributes = data["data"]["attributes"]
+        dates = [
+            parse_datetime(date_str).strftime(DATETIME_FORMAT)
+            for date_str in attributes.get("dates", [])
+        ]
+        padding = [None] * len(dates)
+
+        for item in attributes.get("data", []):
+            # Missing dimension values are None
+            dimensions = item.get("dimensions", [])
+            dimension_values = dict(
+                zip(self.dimensions, list(dimensions) + [None] * len(self.dimensions))
+            )
+            # Missing or short measurement columns are padded with None
+            measurements = item.get("measurements", {})
+            columns = [
+                list(measurements.get(agg_type) or []) + padding
+                for agg_type in self.aggregation_types
+            ]
+            for formatted_date, *values in zip(dates, *columns):
+                record = {"date": formatted_date, "metric_id": self.metric_id}
+                record.update(dimension_values)
+                record.update(zip(self.aggregation_types, values))
+                yield record
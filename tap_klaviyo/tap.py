@@ -1,11 +1,22 @@
 """Klaviyo tap class."""
 
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
 
+from backports.cached_property import cached_property
 from hotglue_singer_sdk import Stream, Tap
 from hotglue_singer_sdk import typing as th
 from hotglue_singer_sdk.helpers.capabilities import AlertingLevel
 from tap_klaviyo.auth import KlaviyoAuthenticator
+from tap_klaviyo.decoding import ijson
+from tap_klaviyo.demux import EventsDemultiplexer
+from tap_klaviyo.metrics import MetricRegistry, normalize_metric_name
+from tap_klaviyo.rate_limit import RateLimiter
+from tap_klaviyo.report_queries import ReportQueryPlan
+from tap_klaviyo.schema_cache import DEFAULT_TTL, SchemaCache, account_key
+from tap_klaviyo.output import MessageWriter, orjson
+from tap_klaviyo.profiling import StreamProfiler
+from tap_klaviyo.telemetry import Telemetry
 
 from tap_klaviyo.exceptions import MissingPermissionsError
 
@@ -60,6 +71,14 @@ class TapKlaviyo(Tap):
         # config may be a dict (tests/programmatic) or a sequence (list/tuple) with path when from CLI
         self.config_file = config[0] if isinstance(config, (list, tuple)) and config else None
         super().__init__(config, catalog, state, parse_env_config, validate_config)
+        if self.config.get("streaming_json") and ijson is None:
+            self.logger.warning("streaming_json is enabled but ijson is not installed; decoding pages whole.")
+        if self.config.get("fast_output") and orjson is None:
+            self.logger.warning("fast_output is enabled but orjson is not installed; serializing with the Singer encoder.")
+        if (
+            self.config.get("discovery_cache_path") or self.config.get("metric_registry_path")
+        ) and account_key(self.config) is None:
+            self.logger.warning("account_id is required to store schemas and metrics with OAuth; they are not stored.")
 
     config_jsonschema = th.PropertiesList(
         th.Property(
@@ -78,6 +97,12 @@ class TapKlaviyo(Tap):
             "api_key",
             th.StringType,
         ),
+        th.Property(
+            "account_id",
+            th.StringType,
+            required=False,
+            description="Klaviyo account id keying the discovery cache and metric registry (required to store them with OAuth)"
+        ),
         th.Property(
             "custom_reports",
             th.ArrayType(
@@ -93,63 +118,347 @@ class TapKlaviyo(Tap):
             required=False,
             description="Custom report configurations for metric aggregates"
         ),
+        th.Property(
+            "discovery_max_workers",
+            th.IntegerType,
+            required=False,
+            description="Number of streams whose schemas are sampled concurrently during discovery (default: 1)"
+        ),
+        th.Property(
+            "events_single_pass",
+            th.BooleanType,
+            required=False,
+            description="Page /events once and route records to the selected events streams by metric"
+        ),
+        th.Property(
+            "contacts_slice_days",
+            th.IntegerType,
+            required=False,
+            description="Split the contacts sync range into time slices of this many days"
+        ),
+        th.Property(
+            "contacts_max_workers",
+            th.IntegerType,
+            required=False,
+            description="Number of contacts time slices fetched concurrently (default: 1)"
+        ),
+        th.Property(
+            "report_max_workers",
+            th.IntegerType,
+            required=False,
+            description="Number of report date windows queried concurrently; opt-in, each concurrent window uses its own share of the metric aggregates rate limit (default: 1)"
+        ),
+        th.Property(
+            "child_max_workers",
+            th.IntegerType,
+            required=False,
+            description="Number of parents whose list members or campaign messages are fetched concurrently (default: 1)"
+        ),
+        th.Property(
+            "rate_limit_headroom",
+            th.NumberType,
+            required=False,
+            description="Fraction of Klaviyo's advertised rate limits the tap paces requests to (default: 0.9)"
+        ),
+        th.Property(
+            "http_pool_size",
+            th.IntegerType,
+            required=False,
+            description="Maximum pooled connections kept open to the Klaviyo API (default: 20)"
+        ),
+        th.Property(
+            "http_keep_alive",
+            th.BooleanType,
+            required=False,
+            description="Reuse connections across requests with keep-alive (default: true)"
+        ),
+        th.Property(
+            "checkpoint_pages",
+            th.BooleanType,
+            required=False,
+            description="Request events and contacts sorted by their replication key and write a resumable STATE after every page"
+        ),
+        th.Property(
+            "fast_output",
+            th.BooleanType,
+            required=False,
+            description="Serialize records with orjson when installed and write them through a buffer flushed before each STATE message"
+        ),
+        th.Property(
+            "prefetch_pages",
+            th.BooleanType,
+            required=False,
+            description="Request the next page in the background while the current page is processed and emitted"
+        ),
+        th.Property(
+            "profile_dir",
+            th.StringType,
+            required=False,
+            description="Directory where cProfile dumps and memory high-water marks of profiled streams are written; profiling is off when unset"
+        ),
+        th.Property(
+            "profile_streams",
+            th.ArrayType(th.StringType),
+            required=False,
+            description="Names or glob patterns of the streams to profile, e.g. events_*; all streams by default"
+        ),
+        th.Property(
+            "profile_sample_rate",
+            th.NumberType,
+            required=False,
+            description="Probability that a selected stream is profiled in a run, between 0 and 1"
+        ),
+        th.Property(
+            "metrics_summary_path",
+            th.StringType,
+            required=False,
+            description="File where per-stream performance metrics are written as JSON during the sync"
+        ),
+        th.Property(
+            "discovery_cache_path",
+            th.StringType,
+            required=False,
+            description="File where discovered schemas are cached between runs"
+        ),
+        th.Property(
+            "metric_registry_path",
+            th.StringType,
+            required=False,
+            description="File where the account's metrics are stored between runs"
+        ),
+        th.Property(
+            "metric_registry_ttl",
+            th.IntegerType,
+            required=False,
+            description="Seconds the stored metrics are used before they are listed again (default: 86400)"
+        ),
+        th.Property(
+            "discovery_sample_size",
+            th.IntegerType,
+            required=False,
+            description="Number of records, over as many pages as needed, sampled to infer each stream's schema (default: 200)"
+        ),
+        th.Property(
+            "discovery_cache_ttl",
+            th.IntegerType,
+            required=False,
+            description="Seconds a cached schema stays valid (default: 86400)"
+        ),
+        th.Property(
+            "incremental_discovery",
+            th.BooleanType,
+            required=False,
+            description="Only sample streams missing from the discovery cache, ignoring its TTL"
+        ),
+        th.Property(
+            "sparse_fieldsets",
+            th.BooleanType,
+            required=False,
+            description="Request only the attributes selected in the catalog (fields[<type>]=...)"
+        ),
+        th.Property(
+            "page_size_target_latency",
+            th.NumberType,
+            required=False,
+            description="Seconds per page above which the page size is reduced (default: 10)"
+        ),
+        th.Property(
+            "streaming_json",
+            th.BooleanType,
+            required=False,
+            description="Parse pages incrementally with ijson instead of decoding them whole"
+        ),
+        th.Property(
+            "sideload_event_resources",
+            th.BooleanType,
+            required=False,
+            description="Request include=profile,metric on events and merge the profile and metric attributes into each event"
+        ),
+        th.Property(
+            "event_profile_fields",
+            th.ArrayType(th.StringType),
+            required=False,
+            description="Profile attributes merged into events when sideload_event_resources is enabled"
+        ),
+        th.Property(
+            "sideload_campaign_messages",
+            th.BooleanType,
+            required=False,
+            description="Fetch campaign messages with include=campaign-messages on the campaigns request"
+        ),
     ).to_dict()
 
-    def metric_name_to_id(self, metrics, metric_name):
-        metric_id = next(
-            (
-                metric["id"] 
-                for metric in metrics 
-                if metric["attributes"]["name"].lower().replace(" ", "") == metric_name.lower().replace(" ", "")
-            ), None)
+    @cached_property
+    def schema_cache(self) -> Optional[SchemaCache]:
+        """Return the persistent discovery cache, or None when it is not configured."""
+        path = self.config.get("discovery_cache_path")
+        account = account_key(self.config)
+        if not path or account is None:
+            return None
+        ttl = self.config.get("discovery_cache_ttl")
+        return SchemaCache(
+            path,
+            account=account,
+            ttl=DEFAULT_TTL if ttl is None else ttl,
+            incremental=bool(self.config.get("incremental_discovery")),
+        )
+
+    @cached_property
+    def metric_registry(self) -> MetricRegistry:
+        """Return the account's metrics, stored between runs when a path is configured."""
+        ttl = self.config.get("metric_registry_ttl")
+        account = account_key(self.config)
+        return MetricRegistry(
+            fetch=lambda: MetricsStream(tap=self).request_records({}),
+            # metrics of an unknown account are not stored
+            path=self.config.get("metric_registry_path") if account is not None else None,
+            account=account or "",
+            ttl=DEFAULT_TTL if ttl is None else ttl,
+        )
+
+    @cached_property
+    def telemetry(self) -> Telemetry:
+        """Per-stream performance counters of this run."""
+        return Telemetry()
+
+    @cached_property
+    def message_writer(self) -> Optional[MessageWriter]:
+        """Return the buffered record output, or None when fast_output is disabled."""
+        if not self.config.get("fast_output"):
+            return None
+        return MessageWriter()
+
+    @cached_property
+    def profiler(self) -> StreamProfiler:
+        """Opt-in profiling of selected streams, off unless a profile directory is set."""
+        return StreamProfiler.from_config(self.config)
+
+    @cached_property
+    def rate_limiter(self) -> RateLimiter:
+        """Per-endpoint request pacing shared by every stream."""
+        return RateLimiter(headroom=float(self.config.get("rate_limit_headroom") or 0.9))
+
+    @cached_property
+    def events_demultiplexer(self) -> Optional[EventsDemultiplexer]:
+        """Return the shared events scan, or None when single-pass mode does not apply."""
+        if not self.config.get("events_single_pass"):
+            return None
+        streams = [
+            stream
+            for stream in self.streams.values()
+            if isinstance(stream, EventsStream) and stream.selected
+        ]
+        # a single stream gains nothing from the shared scan
+        if len(streams) < 2:
+            return None
+        return EventsDemultiplexer(streams)
+
+    @cached_property
+    def report_query_plan(self) -> Optional[ReportQueryPlan]:
+        """Return the shared report queries, or None when no two reports overlap."""
+        streams = [
+            stream
+            for stream in self.streams.values()
+            if isinstance(stream, ReportStream) and stream.selected
+        ]
+        plan = ReportQueryPlan(streams)
+        if not plan.shared_queries:
+            return None
+        self.logger.info(
+            f"{plan.shared_queries} metric aggregates queries are shared by several report streams."
+        )
+        return plan
+
+    def metric_name_to_id(self, metrics=None, metric_name=None):
+        """Return the id of the metric named `metric_name`, looked up in `metrics` if given.
+
+        Without `metrics`, the name is looked up in the metric registry.
+        """
+        if metrics is None:
+            metric_id = self.metric_registry.id_for_name(metric_name)
+        else:
+            name = normalize_metric_name(metric_name)
+            metric_id = next(
+                (metric["id"] for metric in metrics if normalize_metric_name(metric["attributes"]["name"]) == name),
+                None,
+            )
         if not metric_id:
             raise ValueError(f"Metric name {metric_name} not found")
         return metric_id
 
-
-    def discover_streams(self) -> List[Stream]:
-        """Return a list of discovered streams."""
-        discovered_streams = []
-        for stream_class in STREAM_TYPES:
+    def _stream_factory(self, stream_class) -> Callable[[], Optional[Stream]]:
+        """Return a callable that builds a stream, skipping it on missing permissions."""
+        def build():
             try:
-                stream = stream_class(tap=self)
-                discovered_streams.append(stream)
+                return stream_class(tap=self)
             except MissingPermissionsError as e:
                 self.logger.error(f"Error discovering stream {stream_class}: {e}")
-        
+                return None
+        return build
+
+    def _event_stream_factory(self, metric) -> Callable[[], Stream]:
+        """Return a callable that builds the events stream for a single metric."""
+        metric_name = metric["attributes"]["name"]
+        stream_name = f"events_{metric_name}".lower().replace(" ", "_")
+        event_stream_class = type(
+            metric_name,
+            (EventsStream,),
+            {
+                "name": stream_name,
+                "metric_id": metric["id"],
+            },
+        )
+        return lambda: event_stream_class(tap=self)
+
+    def _build_streams(self, factories: List[Callable]) -> list:
+        """Build streams, sampling their schemas concurrently when enabled.
+
+        Results keep the order of `factories` so the catalog is stable.
+        """
+        max_workers = min(int(self.config.get("discovery_max_workers") or 1), len(factories))
+        if max_workers <= 1:
+            return [factory() for factory in factories]
+        self.logger.info(f"Discovering {len(factories)} streams with {max_workers} workers.")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda factory: factory(), factories))
+
+    def discover_streams(self) -> List[Stream]:
+        """Return a list of discovered streams."""
+        discovered_streams = [
+            stream
+            for stream in self._build_streams(
+                [self._stream_factory(stream_class) for stream_class in STREAM_TYPES]
+            )
+            if stream is not None
+        ]
+
         # fetch all metrics (unless they are missing from the existing catalog)
         is_sync = self.input_catalog is not None
         should_query_metrics = next((t for t in iter(self.input_catalog.keys()) if "events_" in t), None) if is_sync else True
         metrics = None
         if should_query_metrics:
             try:
-                metrics_stream = MetricsStream(tap=self)
-                metrics_response = metrics_stream.request_records({})
-                metrics = [record for record in metrics_response]
+                # stored metrics are reused within their TTL, then listed again
+                changed = self.metric_registry.sync()
+                if changed:
+                    self.logger.info(f"{len(changed)} metrics were created or updated since the last listing.")
+                metrics = self.metric_registry.metrics
             except Exception as e:
                 self.logger.error(f"Error fetching metrics: {e}")
                 metrics = []
 
             # create event stream per metric
-            for metric in metrics:
-                metric_name = metric["attributes"]["name"]
-                metric_id = metric["id"]
-                stream_name = f"events_{metric_name}".lower().replace(" ", "_")
-                event_stream = type(
-                    metric_name,
-                    (EventsStream,),
-                    {
-                        "name": stream_name,
-                        "metric_id": metric_id,
-                    },
-                )(tap=self)
-                discovered_streams.append(event_stream)
+            discovered_streams.extend(
+                self._build_streams(
+                    [self._event_stream_factory(metric) for metric in metrics]
+                )
+            )
 
 
 
 
         if metrics:
-            default_reports = self._get_default_reports(metrics)
+            default_reports = self._get_default_reports()
             custom_reports = self.config.get("custom_reports", [])
 
             for report_config in default_reports:
@@ -165,12 +474,12 @@ class TapKlaviyo(Tap):
             custom_reports = self.config.get("custom_reports", [])
             for report_config in custom_reports:
                 if report_config.get("metric_name"):
-                    metric_id = self.metric_name_to_id(metrics, report_config["metric_name"])
+                    metric_id = self.metric_name_to_id(metric_name=report_config["metric_name"])
                     if not metric_id:
                         raise ValueError(f"Metric name {report_config['metric_name']} not found")
                     report_config["metric_id"] = metric_id
 
-                if report_config["metric_id"] not in [m["id"] for m in metrics]:
+                if self.metric_registry.get(report_config["metric_id"]) is None:
                     raise ValueError(f"Metric {report_config['metric_id']} not found in Klaviyo instance")
 
                 report_stream = ReportStream(tap=self, report_config=report_config)
@@ -178,42 +487,46 @@ class TapKlaviyo(Tap):
                 report_stream.primary_keys = ["date", "metric_id"] + report_stream.dimensions
                 discovered_streams.append(report_stream)
 
+        if self.schema_cache:
+            self.schema_cache.save()
+        if metrics:
+            self.metric_registry.save()
         return discovered_streams
 
-    def _get_default_reports(self, metrics):
+    def _get_default_reports(self):
             """Return default report configurations."""
             return [
                 {
                     "name": "emails_opened_per_day", 
-                    "metric_id": self.metric_name_to_id(metrics, "Opened Email"),
+                    "metric_id": self.metric_name_to_id(metric_name="Opened Email"),
                     "dimensions": "Campaign Name,$message",
                     "aggregation_types": "count",
                     "interval": "day"
                 },
                 {
                     "name": "emails_clicked_per_day",
-                    "metric_id": self.metric_name_to_id(metrics, "Clicked Email"),  # Clicked Email
+                    "metric_id": self.metric_name_to_id(metric_name="Clicked Email"),  # Clicked Email
                     "dimensions": "Campaign Name,$message",
                     "aggregation_types": "count",
                     "interval": "day"
                 },
                 {
                     "name": "emails_bounced_per_day",
-                    "metric_id": self.metric_name_to_id(metrics, "Bounced Email"),  # Bounced Email
+                    "metric_id": self.metric_name_to_id(metric_name="Bounced Email"),  # Bounced Email
                     "dimensions": "Campaign Name,$message",
                     "aggregation_types": "count",
                     "interval": "day"
                 },
                 {
                     "name": "emails_received_per_day",
-                    "metric_id": self.metric_name_to_id(metrics, "Received Email"),  # Received Email
+                    "metric_id": self.metric_name_to_id(metric_name="Received Email"),  # Received Email
                     "dimensions": "Campaign Name,$message",
                     "aggregation_types": "count",
                     "interval": "day"
                 },
                 {
                     "name": "campaign_performance_daily",
-                    "metric_id": self.metric_name_to_id(metrics, "Opened Email"),  # Opened Email
+                    "metric_id": self.metric_name_to_id(metric_name="Opened Email"),  # Opened Email
                     "dimensions": "Campaign Name,$message",
                     "aggregation_types": "count",
                     "interval": "day"
@@ -0,0 +1,95 @@
+"""Per-stream performance counters collected during sync."""
+
+import random
+import threading
+from typing import Dict, List
+
+# latencies kept per stream for percentiles; later requests are reservoir-sampled
+MAX_LATENCY_SAMPLES = 10000
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class StreamTelemetry:
+    """Request, paging and processing counters for one stream."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.requests = 0
+        self.bytes = 0
+        self.records = 0
+        self.retries = 0
+        self.backoff_seconds = 0.0
+        self.rate_limited_seconds = 0.0
+        self.post_process_seconds = 0.0
+        self._latencies: List[float] = []
+        self._random = random.Random(0)
+        self._lock = threading.Lock()
+
+    def record_request(self, elapsed: float, content_length: int) -> None:
+        with self._lock:
+            self.requests += 1
+            self.bytes += content_length
+            if len(self._latencies) < MAX_LATENCY_SAMPLES:
+                self._latencies.append(elapsed)
+            else:
+                index = self._random.randrange(self.requests)
+                if index < MAX_LATENCY_SAMPLES:
+                    self._latencies[index] = elapsed
+
+    def record_retry(self, wait: float) -> None:
+        with self._lock:
+            self.retries += 1
+            self.backoff_seconds += wait
+
+    def record_rate_limit_wait(self, wait: float) -> None:
+        if wait > 0:
+            with self._lock:
+                self.rate_limited_seconds += wait
+
+    def record_post_process(self, elapsed: float) -> None:
+        with self._lock:
+            self.records += 1
+            self.post_process_seconds += elapsed
+
+    def summary(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                "requests": self.requests,
+                "latency_p50_seconds": percentile(latencies, 0.5),
+                "latency_p90_seconds": percentile(latencies, 0.9),
+                "latency_p99_seconds": percentile(latencies, 0.99),
+                "latency_max_seconds": latencies[-1] if latencies else 0.0,
+                "bytes": self.bytes,
+                "records": self.records,
+                "retries": self.retries,
+                "backoff_seconds": self.backoff_seconds,
+                "rate_limited_seconds": self.rate_limited_seconds,
+                "post_process_seconds": self.post_process_seconds,
+            }
+
+
+class Telemetry:
+    """Telemetry of every stream of a tap run."""
+
+    def __init__(self):
+        self._streams: Dict[str, StreamTelemetry] = {}
+        self._lock = threading.Lock()
+
+    def for_stream(self, name: str) -> StreamTelemetry:
+        with self._lock:
+            if name not in self._streams:
+                self._streams[name] = StreamTelemetry(name)
+            return self._streams[name]
+
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            streams = list(self._streams.values())
+        return {stream.name: stream.summary() for stream in streams}
@@ -0,0 +1,140 @@
+"""Tests for OAuth token refresh."""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from tap_klaviyo.auth import KlaviyoAuthenticator
+
+
+def _now():
+    return round(datetime.utcnow().timestamp())
+
+
+@pytest.fixture
+def create_authenticator():
+    """Factory for authenticators whose token refresh is counted instead of sent."""
+    def _create(expires_in):
+        tap = SimpleNamespace(
+            _config={"access_token": "old", "refresh_token": "r1", "expires_in": expires_in},
+            config_file=None,
+        )
+        stream = SimpleNamespace(tap_name="tap-klaviyo", config={}, logger=logging.getLogger(), _tap=tap)
+        # bypass the singleton so each test gets its own instance
+        authenticator = object.__new__(KlaviyoAuthenticator)
+        KlaviyoAuthenticator.__init__(authenticator, stream=stream)
+        authenticator.refreshes = []
+
+        def update_access_token():
+            time.sleep(0.05)
+            authenticator.refreshes.append(threading.get_ident())
+            tap._config.update(access_token=f"new{len(authenticator.refreshes)}", expires_in=_now() + 3600)
+
+        authenticator.update_access_token = update_access_token
+        return authenticator
+    return _create
+
+
+def test_concurrent_callers_share_one_refresh(create_authenticator):
+    authenticator = create_authenticator(expires_in=_now() - 10)
+    headers = []
+    threads = [
+        threading.Thread(target=lambda: headers.append(authenticator.auth_headers)) for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(authenticator.refreshes) == 1
+    assert {h["Authorization"] for h in headers} == {"Bearer new1"}
+
+
+def test_token_expiring_soon_is_refreshed_in_the_background(create_authenticator):
+    authenticator = create_authenticator(expires_in=_now() + 300)
+
+    # the current token is still used while the refresh runs
+    assert authenticator.auth_headers["Authorization"] == "Bearer old"
+    assert authenticator.auth_headers["Authorization"] == "Bearer old"
+    # the tap does not exit before the rotated token is stored
+    assert not authenticator._background_refresh.daemon
+    authenticator._background_refresh.join()
+
+    assert len(authenticator.refreshes) == 1
+    assert authenticator.refreshes[0] != threading.get_ident()
+    assert authenticator.auth_headers["Authorization"] == "Bearer new1"
+
+
+def test_refreshed_config_is_written_atomically(create_authenticator, tmp_path, monkeypatch):
+    config_file = tmp_path / "config.json"
+    config_file.write_text("{}")
+    os.chmod(config_file, 0o644)
+    authenticator = create_authenticator(expires_in=_now() - 10)
+    authenticator._tap.config_file = str(config_file)
+    del authenticator.update_access_token
+    response = SimpleNamespace(
+        raise_for_status=lambda: None,
+        json=lambda: {"access_token": "a2", "refresh_token": "r2", "expires_in": 3600},
+    )
+    monkeypatch.setattr(
+        "tap_klaviyo.auth.get_session", lambda config: SimpleNamespace(post=lambda *a, **kw: response)
+    )
+    authenticator._tap.config = {}
+
+    authenticator.refresh_access_token()
+
+    written = json.loads(config_file.read_text())
+    assert (written["access_token"], written["refresh_token"]) == ("a2", "r2")
+    assert oct(os.stat(config_file).st_mode & 0o777) == "0o644"
+    assert os.listdir(tmp_path) == ["config.json"]
+
+
+def test_streams_created_concurrently_share_one_authenticator(monkeypatch):
+    monkeypatch.setattr(KlaviyoAuthenticator, "_SingletonMeta__single_instance", None)
+
+    def slow_init(self, stream, auth_endpoint=None, oauth_scopes=None):
+        time.sleep(0.05)
+
+    monkeypatch.setattr(KlaviyoAuthenticator, "__init__", slow_init)
+    stream = SimpleNamespace(url_base="https://a.klaviyo.com/api")
+    authenticators = []
+    threads = [
+        threading.Thread(target=lambda: authenticators.append(KlaviyoAuthenticator.create_for_stream(stream)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(authenticator) for authenticator in authenticators}) == 1
+
+
+def test_symlinked_config_is_written_in_place(create_authenticator, tmp_path, monkeypatch):
+    target = tmp_path / "secrets" / "config.json"
+    target.parent.mkdir()
+    target.write_text("{}")
+    link = tmp_path / "config.json"
+    link.symlink_to(target)
+    authenticator = create_authenticator(expires_in=_now() - 10)
+    authenticator._tap.config_file = str(link)
+    del authenticator.update_access_token
+    response = SimpleNamespace(
+        raise_for_status=lambda: None,
+        json=lambda: {"access_token": "a2", "refresh_token": "r2", "expires_in": 3600},
+    )
+    monkeypatch.setattr(
+        "tap_klaviyo.auth.get_session", lambda config: SimpleNamespace(post=lambda *a, **kw: response)
+    )
+    authenticator._tap.config = {}
+
+    authenticator.refresh_access_token()
+
+    assert link.is_symlink()
+    assert json.loads(target.read_text())["refresh_token"] == "r2"
@@ -0,0 +1,86 @@
+"""Tests for campaigns / campaign_messages streams."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from tap_klaviyo.streams import CampaignMessagesStream, CampaignsStream
+from tap_klaviyo.telemetry import Telemetry
+
+PAGE = {
+    "data": [
+        {
+            "type": "campaign",
+            "id": "c1",
+            "relationships": {"campaign-messages": {"data": [{"type": "campaign-message", "id": "m1"}]}},
+        },
+        {
+            "type": "campaign",
+            "id": "c2",
+            "relationships": {"campaign-messages": {"data": [{"type": "campaign-message", "id": "m9"}]}},
+        },
+    ],
+    "included": [
+        {
+            "type": "campaign-message",
+            "id": "m1",
+            "attributes": {"label": "Welcome"},
+            "relationships": {"template": {"data": {"type": "template", "id": "t1"}}},
+        },
+    ],
+}
+
+
+@pytest.fixture
+def messages_stream():
+    stream = object.__new__(CampaignMessagesStream)
+    stream._config = {}
+    stream._sideloaded = {}
+    stream._tap = SimpleNamespace(telemetry=Telemetry())
+    stream.__dict__["_discovered_schema"] = {"properties": {}}
+    return stream
+
+
+@pytest.fixture
+def campaigns_stream(monkeypatch, messages_stream):
+    monkeypatch.setattr(
+        CampaignsStream, "campaign_messages_stream", property(lambda self: messages_stream)
+    )
+    stream = object.__new__(CampaignsStream)
+    stream._config = {"sideload_campaign_messages": True}
+    return stream
+
+
+def test_included_messages_are_handed_to_child(campaigns_stream, messages_stream):
+    """Messages in `included` are stored per campaign; incomplete campaigns are skipped."""
+    campaigns_stream._sideload_campaign_messages(PAGE)
+
+    assert list(messages_stream._sideloaded) == ["c1"]
+
+
+def test_sideloaded_messages_are_emitted_without_requests(campaigns_stream, messages_stream, monkeypatch):
+    campaigns_stream._sideload_campaign_messages(PAGE)
+    monkeypatch.setattr(
+        "tap_klaviyo.client.KlaviyoStream.get_records",
+        lambda self, context: pytest.fail("campaign messages should not be requested"),
+    )
+    records = list(messages_stream.get_records({"id": "c1", "channel": "email"}))
+
+    assert records == [{
+        "type": "campaign-message",
+        "id": "m1",
+        "relationships": {"template": {"data": {"type": "template", "id": "t1"}}},
+        "label": "Welcome",
+        "campaign_id": "c1",
+        "template_id": "t1",
+    }]
+    assert messages_stream._sideloaded == {}
+
+
+def test_include_param_replaces_sparse_fieldset(campaigns_stream):
+    campaigns_stream._tap_state = {}
+    campaigns_stream._state_partitioning_keys = None
+    campaigns_stream._replication_key = None
+    params = campaigns_stream.get_url_params({"channel": "sms"}, None)
+
+    assert params == {"filter": "equals(messages.channel,'sms')", "include": "campaign-messages"}
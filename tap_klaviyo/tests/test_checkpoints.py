@@ -0,0 +1,63 @@
+"""Tests for sorted, page-checkpointed event syncs."""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from tap_klaviyo.streams import EventsStream
+
+
+def _page(timestamps):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps(
+        {"data": [{"id": str(i), "datetime": value} for i, value in enumerate(timestamps)]}
+    ).encode()
+    return response
+
+
+@pytest.fixture
+def events_stream(monkeypatch):
+    stream = object.__new__(EventsStream)
+    stream._config = {"checkpoint_pages": True}
+    stream._tap = SimpleNamespace(events_demultiplexer=None)
+    stream._tap_state = {}
+    stream._state_partitioning_keys = None
+    stream.forced_replication_method = None
+    monkeypatch.setattr(EventsStream, "post_process", lambda self, row, context: row)
+    return stream
+
+
+def test_sorted_requests_ask_for_replication_key_order(events_stream):
+    events_stream._config["start_date"] = "2024-01-01T00:00:00Z"
+
+    assert events_stream.is_sorted
+    assert events_stream.get_url_params(None, None)["sort"] == "datetime"
+
+    unsorted = object.__new__(EventsStream)
+    unsorted._config = {}
+    assert not unsorted.is_sorted
+
+
+def test_state_is_written_per_page_without_splitting_timestamps(events_stream, monkeypatch):
+    pages = [["2024-01-01", "2024-01-02"], ["2024-01-02", "2024-01-03"], ["2024-01-04"]]
+    monkeypatch.setattr(
+        EventsStream,
+        "request_records",
+        lambda self, context: (r for page in pages for r in self.parse_response(_page(page))),
+    )
+    written = []
+    monkeypatch.setattr(
+        EventsStream,
+        "_write_state_message",
+        lambda self: written.append(self.stream_state.get("replication_key_value")),
+    )
+
+    for record in events_stream.get_records(None):
+        events_stream._increment_stream_state(record, context=None)
+
+    # the second page starts with 2024-01-02, so the first checkpoint stops before it
+    assert written == ["2024-01-01", "2024-01-02"]
+    assert events_stream.stream_state["replication_key_value"] == "2024-01-04"
@@ -0,0 +1,114 @@
+"""Tests for concurrent child stream fetching."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from hotglue_singer_sdk.streams import RESTStream
+
+from tap_klaviyo.profiling import StreamProfiler
+from tap_klaviyo.streams import ListMembersStream, ListsStream
+
+
+@pytest.fixture
+def streams(monkeypatch):
+    monkeypatch.setattr(ListMembersStream, "selected", True)
+    child = object.__new__(ListMembersStream)
+    child._config = {"child_max_workers": 3}
+    child._tap = SimpleNamespace(profiler=StreamProfiler(None))
+    child.state_partitioning_keys = None
+    child.get_context_state = lambda context: {}
+    emitted = []
+    child.sync = lambda context: emitted.extend(child.get_records(context))
+
+    parent = object.__new__(ListsStream)
+    parent._config = child._config
+    parent.child_streams = [child]
+    return parent, child, emitted
+
+
+def test_child_records_are_fetched_concurrently_and_emitted_in_parent_order(streams, monkeypatch):
+    parent, child, emitted = streams
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def get_records(self, context):
+        with lock:
+            running.append(context["list_id"])
+            peak.append(len(running))
+        # later lists finish first
+        time.sleep(0.05 * (3 - int(context["list_id"])))
+        with lock:
+            running.remove(context["list_id"])
+        for i in range(3):
+            yield {"list_id": context["list_id"], "i": i}
+
+    monkeypatch.setattr(RESTStream, "get_records", get_records)
+    parent._sync_children_with_threads([{"list_id": "0"}, {"list_id": "1"}, {"list_id": "2"}])
+
+    assert [(r["list_id"], r["i"]) for r in emitted] == [
+        (list_id, i) for list_id in "012" for i in range(3)
+    ]
+    assert max(peak) > 1
+    assert child.state_partitioning_keys == ["list_id"]
+    assert child.__dict__["_prefetched"] == {}
+
+
+def test_child_fetch_errors_reach_the_syncing_thread(streams, monkeypatch):
+    parent, _, _ = streams
+
+    def get_records(self, context):
+        if context["list_id"] == "1":
+            raise RuntimeError("boom")
+        yield from ({"i": i} for i in range(5000))
+
+    monkeypatch.setattr(RESTStream, "get_records", get_records)
+    with pytest.raises(RuntimeError, match="boom"):
+        parent._sync_children_with_threads([{"list_id": "0"}, {"list_id": "1"}, {"list_id": "2"}])
+
+
+def test_parallelization_limit_only_applies_to_child_streams(streams):
+    parent, child, _ = streams
+
+    assert child.parallelization_limit == 3
+    assert parent.parallelization_limit == 1
+    assert parent.get_child_threads() == 3
+
+
+def test_prefetched_children_request_records_after_their_partition_bookmark(monkeypatch):
+    monkeypatch.setattr(ListMembersStream, "selected", True)
+    child = object.__new__(ListMembersStream)
+    child._config = {"start_date": "2020-01-01T00:00:00Z"}
+    child._tap = SimpleNamespace(profiler=StreamProfiler(None), input_catalog=None)
+    child._tap_state = {
+        "bookmarks": {
+            "list_members": {
+                "partitions": [
+                    {
+                        "context": {"id": "L1"},
+                        "replication_key": "joined_group_at",
+                        "replication_key_value": "2024-01-01T03:00:00+00:00",
+                    }
+                ]
+            }
+        }
+    }
+    child._state_partitioning_keys = None
+    child.forced_replication_method = None
+    child.__dict__["_discovered_schema"] = {
+        "properties": {"joined_group_at": {"type": ["string", "null"], "format": "date-time"}}
+    }
+    sent = []
+
+    def get_records(self, context):
+        sent.append(self.get_url_params(context, None)["filter"])
+        return iter(())
+
+    monkeypatch.setattr(RESTStream, "get_records", get_records)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        list(child.prefetch(executor, {"id": "L1"}))
+
+    assert sent == ["greater-than(joined_group_at,2024-01-01T03:00:00Z)"]
@@ -0,0 +1,109 @@
+"""Tests for ContactsStream time-sliced backfills and sparse fieldsets."""
+
+from types import SimpleNamespace
+
+import pytest
+from hotglue_singer_sdk.helpers._singer import SelectionMask
+from pendulum import parse
+
+from tap_klaviyo.streams import ContactsStream
+from tap_klaviyo.telemetry import Telemetry
+
+
+@pytest.fixture
+def create_contacts_stream():
+    """Factory for ContactsStream instances with a custom config and empty state."""
+    def _create(config):
+        stream = object.__new__(ContactsStream)
+        stream._config = dict(config)
+        stream._tap_state = {}
+        stream._replication_key = "updated"
+        stream._state_partitioning_keys = None
+        return stream
+    return _create
+
+
+@pytest.fixture
+def create_selected_contacts_stream(create_contacts_stream):
+    """Factory for a ContactsStream synced from a catalog selecting some attributes."""
+    def _create(selected, sparse_fieldsets=True):
+        stream = create_contacts_stream({"sparse_fieldsets": sparse_fieldsets})
+        stream._tap = SimpleNamespace(input_catalog={"contacts": {}}, telemetry=Telemetry())
+        stream.__dict__["_discovered_schema"] = {
+            "properties": {
+                name: {"type": ["string", "null"]}
+                for name in ["id", "type", "links", "email", "first_name", "location", "updated"]
+            }
+        }
+        stream._mask = SelectionMask({
+            ("properties", name): name in selected
+            for name in ["email", "first_name", "location", "updated"]
+        })
+        return stream
+    return _create
+
+
+def test_paging_windows_cover_range_without_gaps(create_contacts_stream):
+    """Slices are consecutive and end exactly at end_date."""
+    stream = create_contacts_stream({
+        "start_date": "2024-01-01T00:00:00Z",
+        "end_date": "2024-01-25T00:00:00Z",
+        "contacts_slice_days": 10,
+    })
+    windows = stream.get_paging_windows(None)
+
+    assert [(w["window_start"].day, w["window_end"].day) for w in windows] == [
+        (1, 11), (11, 21), (21, 25),
+    ]
+
+
+def test_paging_windows_disabled_by_default(create_contacts_stream):
+    """Without contacts_slice_days the stream keeps a single cursor walk."""
+    stream = create_contacts_stream({"start_date": "2024-01-01T00:00:00Z"})
+    assert stream.get_paging_windows(None) == []
+
+
+def test_window_filter_uses_slice_bounds(create_contacts_stream):
+    """Each slice becomes its own greater-than/less-or-equal filter."""
+    stream = create_contacts_stream({
+        "start_date": "2024-01-01T00:00:00Z",
+        "end_date": "2024-02-01T00:00:00Z",
+    })
+    context = {
+        "window_start": parse("2024-01-11T00:00:00Z"),
+        "window_end": parse("2024-01-21T00:00:00Z"),
+    }
+    params = stream.get_url_params(context, None)
+
+    assert params["filter"] == (
+        "and(greater-than(updated,2024-01-11T00:00:00Z),"
+        "less-or-equal(updated,2024-01-21T00:00:00Z))"
+    )
+
+
+def test_sparse_fieldset_requests_selected_attributes(create_selected_contacts_stream):
+    """Only selected attributes (plus the replication key) are requested."""
+    stream = create_selected_contacts_stream({"email"})
+    params = stream.get_url_params(None, None)
+
+    assert params["fields[profile]"] == "email,updated"
+
+
+def test_sparse_fieldset_skipped_when_everything_selected(create_selected_contacts_stream):
+    stream = create_selected_contacts_stream({"email", "first_name", "location", "updated"})
+    assert "fields[profile]" not in stream.get_url_params(None, None)
+
+
+def test_sparse_fieldset_is_opt_in(create_selected_contacts_stream):
+    stream = create_selected_contacts_stream({"email"}, sparse_fieldsets=False)
+    assert "fields[profile]" not in stream.get_url_params(None, None)
+
+
+def test_unselected_attributes_dropped_before_post_process(create_selected_contacts_stream):
+    stream = create_selected_contacts_stream({"email"})
+    row = {
+        "type": "profile",
+        "id": "p1",
+        "attributes": {"email": "a@b.c", "first_name": "Ada", "location": {"city": "X"}},
+    }
+    assert stream.post_process(row, None) == {"type": "profile", "id": "p1", "email": "a@b.c"}
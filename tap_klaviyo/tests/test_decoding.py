@@ -0,0 +1,50 @@
+"""Tests for decoding response bodies once and streaming them."""
+
+import io
+import json
+
+import pytest
+import requests
+
+from tap_klaviyo.decoding import (
+    iter_streamed_records,
+    response_json,
+    streamed_next_link,
+)
+
+PAGE = {
+    "data": [
+        {"type": "event", "id": "e1", "attributes": {"value": 1.5, "tags": ["a"]}},
+        {"type": "event", "id": "e2", "attributes": {"value": None, "nested": {"x": {}}}},
+    ],
+    "links": {"self": "https://a.klaviyo.com/api/events", "next": "https://a.klaviyo.com/api/events?page%5Bcursor%5D=abc"},
+}
+
+
+def _response(body):
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(json.dumps(body).encode("utf-8"))
+    return response
+
+
+def test_response_json_decodes_once(mock_response):
+    response = mock_response(PAGE)
+    assert response_json(response) is response_json(response)
+    assert response.json.call_count == 1
+
+
+def test_streamed_records_match_full_decode():
+    pytest.importorskip("ijson")
+    response = _response(PAGE)
+
+    assert list(iter_streamed_records(response)) == PAGE["data"]
+    assert streamed_next_link(response) == PAGE["links"]["next"]
+
+
+def test_streamed_last_page_has_no_next_link():
+    pytest.importorskip("ijson")
+    response = _response({"data": [], "links": {"self": "x", "next": None}})
+
+    assert list(iter_streamed_records(response)) == []
+    assert streamed_next_link(response) is None
@@ -0,0 +1,108 @@
+"""Tests for the single-pass events demultiplexer."""
+
+import logging
+import tempfile
+
+import pytest
+from pendulum import parse
+
+from tap_klaviyo.demux import EventsDemultiplexer
+
+
+def _event(event_id, metric_id, datetime):
+    return {
+        "type": "event",
+        "id": event_id,
+        "attributes": {"datetime": datetime},
+        "relationships": {"metric": {"data": {"type": "metric", "id": metric_id}}},
+    }
+
+
+EVENTS = [
+    _event("e1", "m1", "2024-01-01T00:00:00+00:00"),
+    _event("e2", "m2", "2024-01-02T00:00:00+00:00"),
+    _event("e3", "m3", "2024-01-03T00:00:00+00:00"),
+    _event("e4", "m1", "2024-01-04T00:00:00+00:00"),
+]
+
+
+class FakeEventsStream:
+    """Minimal stand-in for EventsStream exposing what the demultiplexer uses."""
+
+    replication_key = "datetime"
+    logger = logging.getLogger("tap-klaviyo-tests")
+
+    def __init__(self, name, metric_id=None, start=None):
+        self.name = name
+        self.metric_id = metric_id
+        self.start = parse(start) if start else None
+        self.requested_contexts = []
+
+    def get_starting_time(self, context):
+        return self.start
+
+    def request_records(self, context):
+        self.requested_contexts.append(context)
+        yield from EVENTS
+
+
+def test_records_are_routed_by_metric():
+    """Each stream only receives the events of its metric; the base stream gets all."""
+    base = FakeEventsStream("events")
+    m1 = FakeEventsStream("events_m1", "m1")
+    m2 = FakeEventsStream("events_m2", "m2")
+    demux = EventsDemultiplexer([base, m1, m2])
+
+    assert [r["id"] for r in demux.records_for(m1)] == ["e1", "e4"]
+    assert [r["id"] for r in demux.records_for(m2)] == ["e2"]
+    assert [r["id"] for r in demux.records_for(base)] == ["e1", "e2", "e3", "e4"]
+
+
+def test_events_are_paged_once():
+    """Only the first stream to read triggers the scan, without a metric filter."""
+    m1 = FakeEventsStream("events_m1", "m1")
+    m2 = FakeEventsStream("events_m2", "m2")
+    demux = EventsDemultiplexer([m1, m2])
+    list(demux.records_for(m1))
+    list(demux.records_for(m2))
+
+    assert len(m1.requested_contexts) == 1
+    assert m1.requested_contexts[0]["all_metrics"] is True
+    assert m2.requested_contexts == []
+
+
+def test_each_stream_keeps_its_own_bookmark():
+    """The scan starts at the earliest bookmark; later bookmarks filter their own records."""
+    m1 = FakeEventsStream("events_m1", "m1", start="2024-01-02T00:00:00Z")
+    m2 = FakeEventsStream("events_m2", "m2", start="2023-12-01T00:00:00Z")
+    demux = EventsDemultiplexer([m1, m2])
+
+    assert [r["id"] for r in demux.records_for(m1)] == ["e4"]
+    assert m1.requested_contexts[0]["window_start"] == parse("2023-12-01T00:00:00Z")
+    assert [r["id"] for r in demux.records_for(m2)] == ["e2"]
+
+
+def test_spools_are_closed_when_the_scan_fails(monkeypatch):
+    """A scan failing partway through leaves no spool open."""
+    opened = []
+    real_temporary_file = tempfile.TemporaryFile
+
+    def temporary_file(*args, **kwargs):
+        opened.append(real_temporary_file(*args, **kwargs))
+        return opened[-1]
+
+    def failing_records(context):
+        yield EVENTS[0]
+        raise ConnectionError("connection reset")
+
+    monkeypatch.setattr("tap_klaviyo.demux.tempfile.TemporaryFile", temporary_file)
+    m1 = FakeEventsStream("events_m1", "m1")
+    m1.request_records = failing_records
+    demux = EventsDemultiplexer([m1, FakeEventsStream("events_m2", "m2")])
+
+    with pytest.raises(ConnectionError):
+        list(demux.records_for(m1))
+
+    assert len(opened) == 2
+    assert all(spool.closed for spool in opened)
+    assert demux._spools == {}
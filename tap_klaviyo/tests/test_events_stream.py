@@ -0,0 +1,100 @@
+"""Tests for profiles and metrics sideloaded into events."""
+
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+import requests
+from hotglue_singer_sdk.helpers._singer import SelectionMask
+
+from tap_klaviyo.streams import EventsStream
+
+PAGE = {
+    "data": [
+        {
+            "type": "event",
+            "id": "e1",
+            "attributes": {"datetime": "2024-01-01T00:00:00+00:00"},
+            "relationships": {
+                "profile": {"data": {"type": "profile", "id": "p1"}},
+                "metric": {"data": {"type": "metric", "id": "m1"}},
+            },
+        },
+        {
+            "type": "event",
+            "id": "e2",
+            "attributes": {"datetime": "2024-01-02T00:00:00+00:00"},
+            "relationships": {"profile": {"data": None}, "metric": {"data": {"type": "metric", "id": "m1"}}},
+        },
+    ],
+    "included": [
+        {"type": "profile", "id": "p1", "attributes": {"email": "ada@example.com"}},
+        {"type": "metric", "id": "m1", "attributes": {"name": "Opened Email"}},
+    ],
+}
+
+
+@pytest.fixture
+def events_stream():
+    stream = object.__new__(EventsStream)
+    stream._config = {"sideload_event_resources": True, "event_profile_fields": ["email", "location"]}
+    stream._tap = SimpleNamespace(input_catalog=None, schema_cache=None)
+    stream._tap_state = {}
+    stream._state_partitioning_keys = None
+    return stream
+
+
+def test_included_resources_are_requested_and_merged(events_stream):
+    params = events_stream.get_url_params({}, None)
+    assert params["include"] == "profile,metric"
+    assert params["fields[profile]"] == "email,location"
+    assert params["fields[metric]"] == "name"
+
+    response = requests.Response()
+    response._content = json.dumps(PAGE).encode()
+    records = list(events_stream.parse_response(response))
+
+    assert records[0]["profile"] == {"id": "p1", "email": "ada@example.com"}
+    assert records[0]["metric"] == {"id": "m1", "name": "Opened Email"}
+    assert "profile" not in records[1]
+    assert records[1]["metric"]["name"] == "Opened Email"
+
+
+def test_deselected_resources_are_not_requested(events_stream):
+    events_stream._tap.input_catalog = {"events": {}}
+    events_stream._mask = SelectionMask({("properties", "profile"): False})
+
+    assert events_stream.get_url_params({}, None)["include"] == "metric"
+    assert "fields[profile]" not in events_stream.get_url_params({}, None)
+
+
+def test_sideloaded_properties_are_added_to_the_cached_schema(events_stream):
+    events_stream.get_schema = lambda: {"type": "object", "properties": {"id": {"type": ["string"]}}}
+
+    properties = events_stream._get_cached_schema()["properties"]
+
+    assert list(properties["profile"]["properties"]) == ["id", "email", "location"]
+    assert "object" in properties["profile"]["properties"]["location"]["type"]
+    assert list(properties["metric"]["properties"]) == ["id", "name"]
+
+
+def test_metric_filter_keeps_the_incremental_bound(events_stream):
+    stream = object.__new__(type("Opened Email", (EventsStream,), {"name": "events_opened_email", "metric_id": "m1"}))
+    stream.__dict__.update(events_stream.__dict__)
+    stream._config = {"checkpoint_pages": True}
+    stream._tap.events_demultiplexer = None
+    stream.get_starting_time = lambda context: datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    stream.get_ending_time = lambda context: None
+    assert stream.get_url_params({}, None)["filter"] == (
+        "and(equals(metric_id,'m1'),greater-than(datetime,2024-01-01T00:00:00Z))"
+    )
+
+    stream.get_ending_time = lambda context: datetime(2024, 2, 1, tzinfo=timezone.utc)
+    params = stream.get_url_params({}, None)
+    assert params["filter"] == (
+        "and(equals(metric_id,'m1'),greater-than(datetime,2024-01-01T00:00:00Z),"
+        "less-or-equal(datetime,2024-02-01T00:00:00Z))"
+    )
+    assert params["sort"] == "datetime"
@@ -0,0 +1,90 @@
+"""Tests for streaming schema inference."""
+
+import pytest
+
+from tap_klaviyo.inference import SchemaInference, merge_schemas
+from tap_klaviyo.streams import ContactsStream
+
+
+@pytest.fixture
+def stream():
+    stream = object.__new__(ContactsStream)
+    stream._config = {}
+    return stream
+
+
+@pytest.fixture
+def inference(stream):
+    return SchemaInference(
+        lambda name, value: stream._infer_property_type(name, value).to_dict()[name]
+    )
+
+
+def test_types_are_merged_across_records(inference):
+    inference.add_all(
+        [
+            {"id": "1", "score": 1, "code": None, "created": "2024-01-01T00:00:00Z"},
+            {"id": "2", "score": 2.5, "code": 10, "created": "not a date"},
+            {"id": "3", "score": None, "code": "A10", "flag": True},
+        ]
+    )
+    properties = inference.properties()
+
+    assert list(properties) == ["id", "score", "code", "created", "flag"]
+    assert properties["score"]["type"] == ["number", "null"]
+    assert set(properties["code"]["type"]) == {"integer", "string", "null"}
+    assert "format" not in properties["created"]
+    assert properties["flag"]["type"] == ["boolean", "null"]
+
+
+def test_all_null_field_is_a_string(inference):
+    inference.add({"title": None})
+
+    assert inference.properties()["title"] == {"type": ["string", "null"]}
+
+
+def test_nested_properties_are_merged(inference):
+    inference.add({"location": {"city": "Boston"}})
+    inference.add({"location": {"zip": 2134, "city": None}})
+
+    location = inference.properties()["location"]
+    assert set(location["properties"]) == {"city", "zip"}
+    assert "integer" in location["properties"]["zip"]["type"]
+
+
+def test_top_level_mixed_boolean_is_not_coercible(inference):
+    """A top-level field seen as bool and string must not list boolean (HGI-10622)."""
+    inference.add({"title": True})
+    inference.add({"title": "CEO"})
+
+    assert "boolean" not in inference.properties()["title"]["type"]
+
+
+def test_merge_keeps_date_time_format_only_when_consistent():
+    date_time = {"type": ["string", "null"], "format": "date-time"}
+
+    assert merge_schemas(date_time, {"type": ["null"]})["format"] == "date-time"
+    assert "format" not in merge_schemas(date_time, {"type": ["string", "null"]})
+
+
+def test_discovery_pages_until_sample_size(stream, monkeypatch):
+    pages = {
+        "first": ([{"id": str(i)} for i in range(3)], "second"),
+        "second": ([{"id": str(i)} for i in range(3, 6)], "third"),
+        "third": ([{"id": "6"}], None),
+    }
+    requested = []
+
+    def get_data_page(self, method, url, headers):
+        requested.append(url)
+        return pages[url]
+
+    monkeypatch.setattr(ContactsStream, "get_data_page", get_data_page)
+    monkeypatch.setattr("tap_klaviyo.client.KlaviyoStream.get_data_page", get_data_page)
+    monkeypatch.setattr(ContactsStream, "max_page_size", None)
+    monkeypatch.setattr(ContactsStream, "request_decorator", lambda self, func: func)
+
+    records = list(stream._iter_discovery_records("GET", "first", {}, limit=5))
+
+    assert [r["id"] for r in records] == ["0", "1", "2", "3", "4"]
+    assert requested == ["first", "second"]
@@ -0,0 +1,94 @@
+"""Tests for the stored metric registry."""
+
+import pytest
+
+from tap_klaviyo.metrics import MetricRegistry
+
+
+def _metric(metric_id, name):
+    return {"type": "metric", "id": metric_id, "attributes": {"name": name}}
+
+
+class FakeFetch:
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return iter(self.metrics)
+
+
+@pytest.fixture
+def fetch():
+    return FakeFetch([_metric("m1", "Opened Email"), _metric("m2", "Clicked Email")])
+
+
+@pytest.fixture
+def registry_path(tmp_path):
+    return str(tmp_path / "metrics.json")
+
+
+def test_names_are_matched_ignoring_case_and_spaces(fetch):
+    registry = MetricRegistry(fetch)
+
+    assert registry.id_for_name("opened email") == "m1"
+    assert registry.id_for_name("ClickedEmail") == "m2"
+    assert registry.get("m2")["attributes"]["name"] == "Clicked Email"
+    assert fetch.calls == 1
+
+
+def test_stored_metrics_are_reused_until_they_expire(fetch, registry_path):
+    def clock():
+        return 1000.0
+
+    registry = MetricRegistry(fetch, path=registry_path, account="acct", ttl=60, clock=clock)
+    assert registry.metrics
+    registry.save()
+
+    reloaded = MetricRegistry(fetch, path=registry_path, account="acct", ttl=60, clock=clock)
+    assert reloaded.id_for_name("Opened Email") == "m1"
+    assert fetch.calls == 1
+
+    expired = MetricRegistry(fetch, path=registry_path, account="acct", ttl=60, clock=lambda: 2000.0)
+    assert expired.metrics
+    assert fetch.calls == 2
+
+    other_account = MetricRegistry(fetch, path=registry_path, account="other", ttl=60, clock=clock)
+    assert other_account.metrics
+    assert fetch.calls == 3
+
+
+def test_unknown_metric_refreshes_the_stored_registry_once(fetch, registry_path):
+    stored = MetricRegistry(fetch, path=registry_path, account="acct")
+    assert stored.metrics
+    stored.save()
+    fetch.metrics.append(_metric("m3", "Placed Order"))
+
+    registry = MetricRegistry(fetch, path=registry_path, account="acct")
+    assert registry.id_for_name("Opened Email") == "m1"
+    assert fetch.calls == 1
+    assert registry.id_for_name("Placed Order") == "m3"
+    assert registry.id_for_name("Viewed Product") is None
+    assert registry.get("missing") is None
+    assert fetch.calls == 2
+
+
+def test_sync_reuses_a_fresh_registry_and_reports_changes_once_it_expires(fetch, registry_path):
+    stored = MetricRegistry(fetch, path=registry_path, account="acct", clock=lambda: 1000.0)
+    assert stored.metrics
+    stored.save()
+    fetch.metrics[0] = dict(fetch.metrics[0], attributes={"name": "Opened Email", "updated": "2024-02-01"})
+    fetch.metrics.append(_metric("m3", "Placed Order"))
+
+    fresh = MetricRegistry(fetch, path=registry_path, account="acct", ttl=60, clock=lambda: 1030.0)
+    assert fresh.sync() == []
+    assert fetch.calls == 1
+
+    expired = MetricRegistry(fetch, path=registry_path, account="acct", ttl=60, clock=lambda: 2000.0)
+    changed = expired.sync()
+
+    assert fetch.calls == 2
+    assert [metric["id"] for metric in changed] == ["m1", "m3"]
+    assert expired.id_for_name("Placed Order") == "m3"
+    assert fetch.calls == 2
@@ -0,0 +1,45 @@
+"""Tests for buffered Singer output."""
+
+import json
+from decimal import Decimal
+from types import SimpleNamespace
+
+import singer
+
+from tap_klaviyo.output import MessageWriter, format_message
+from tap_klaviyo.streams import EventsStream
+
+
+def test_messages_serialize_to_one_json_line():
+    message = singer.RecordMessage(stream="events", record={"id": "e1", "value": 1.5})
+    assert json.loads(format_message(message)) == {
+        "type": "RECORD", "stream": "events", "record": {"id": "e1", "value": 1.5}
+    }
+    assert format_message(message).endswith("}\n")
+
+    # not handled by orjson, written by the Singer encoder instead
+    message = singer.RecordMessage(stream="events", record={"value": Decimal("0.1")})
+    assert format_message(message) == '{"type": "RECORD", "stream": "events", "record": {"value": 0.1}}\n'
+
+
+def test_records_are_buffered_until_state_is_written(monkeypatch, capsys):
+    monkeypatch.setattr(
+        EventsStream,
+        "_generate_record_messages",
+        lambda self, record: [singer.RecordMessage(stream="events", record=record)],
+    )
+    monkeypatch.setattr(
+        "hotglue_singer_sdk.streams.core.Stream._write_state_message",
+        lambda self: singer.write_message(singer.StateMessage(value={})),
+    )
+    stream = object.__new__(EventsStream)
+    stream._tap = SimpleNamespace(message_writer=MessageWriter())
+
+    stream._write_record_message({"id": "e1"})
+    stream._write_record_message({"id": "e2"})
+    assert capsys.readouterr().out == ""
+
+    stream._write_state_message()
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [line["type"] for line in lines] == ["RECORD", "RECORD", "STATE"]
+    assert [line["record"]["id"] for line in lines[:2]] == ["e1", "e2"]
@@ -0,0 +1,133 @@
+"""Tests for adaptive page size control and page prefetching."""
+
+import io
+import json
+import logging
+import threading
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+from requests.exceptions import ReadTimeout
+from urllib3.exceptions import ProtocolError
+
+from tap_klaviyo.paging import AdaptivePageSize, with_page_size
+from tap_klaviyo.profiling import StreamProfiler
+from tap_klaviyo.streams import ContactsStream, EventsStream
+
+
+def test_with_page_size_replaces_existing_value():
+    url = "https://a.klaviyo.com/api/profiles?filter=greater-than%28updated%2C2024%29&page%5Bsize%5D=100"
+    query = parse_qs(urlparse(with_page_size(url, 25)).query)
+
+    assert query["page[size]"] == ["25"]
+    assert query["filter"] == ["greater-than(updated,2024)"]
+
+
+def test_page_size_starts_at_maximum():
+    assert AdaptivePageSize(maximum=100).size == 100
+
+
+def test_timeouts_shrink_down_to_minimum():
+    page_size = AdaptivePageSize(maximum=100, minimum=10)
+    for _ in range(5):
+        page_size.record_failure(ReadTimeout())
+
+    assert page_size.size == 10
+
+
+def test_slow_or_large_pages_shrink_and_fast_pages_grow_back():
+    page_size = AdaptivePageSize(maximum=100, target_latency=8, max_page_bytes=1000)
+    page_size.record_success(elapsed=9, content_length=10)
+    assert page_size.size == 50
+    page_size.record_success(elapsed=1, content_length=5000)
+    assert page_size.size == 25
+    page_size.record_success(elapsed=1, content_length=10)
+    page_size.record_success(elapsed=1, content_length=10)
+    page_size.record_success(elapsed=1, content_length=10)
+    assert page_size.size == 100
+
+
+def _page(records, next_cursor=None):
+    response = requests.Response()
+    response.status_code = 200
+    next_link = f"https://a.klaviyo.com/api/events?page[cursor]={next_cursor}" if next_cursor else None
+    response._content = json.dumps({"data": records, "links": {"next": next_link}}).encode()
+    return response
+
+
+def test_next_page_is_requested_while_the_current_page_is_emitted(monkeypatch):
+    pages = {None: _page([{"id": 1}, {"id": 2}], "c2"), "c2": _page([{"id": 3}])}
+    requested = {token: threading.Event() for token in pages}
+
+    def send(self, prepared_request, context):
+        requested[prepared_request.token].set()
+        return pages[prepared_request.token]
+
+    monkeypatch.setattr(EventsStream, "_request", send)
+    monkeypatch.setattr(EventsStream, "request_decorator", lambda self, func: func)
+    monkeypatch.setattr(EventsStream, "update_sync_costs", lambda self, *args: None)
+    monkeypatch.setattr(
+        EventsStream,
+        "prepare_request",
+        lambda self, context, next_page_token: SimpleNamespace(token=next_page_token),
+    )
+    stream = object.__new__(EventsStream)
+    stream._config = {"prefetch_pages": True}
+    stream._tap = SimpleNamespace(profiler=StreamProfiler(None))
+
+    records = stream.request_records({})
+    assert next(records) == {"id": 1}
+    # page 2 is on its way before the rest of page 1 has been consumed
+    assert requested["c2"].wait(timeout=5)
+    assert list(records) == [{"id": 2}, {"id": 3}]
+
+
+class BrokenBody:
+    """A body that fails after `limit` bytes, like a connection dropped mid-page."""
+
+    def __init__(self, body, limit):
+        self.body = io.BytesIO(body[:limit])
+
+    def read(self, size=-1):
+        chunk = self.body.read(size)
+        if size and not chunk:
+            raise ProtocolError("Connection broken: IncompleteRead")
+        return chunk
+
+    def close(self):
+        self.body.close()
+
+
+def _streamed_page(body, limit=None):
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = BrokenBody(body, limit) if limit else io.BytesIO(body)
+    response.request = SimpleNamespace(url="https://a.klaviyo.com/api/profiles?page[size]=100")
+    response.__dict__["_streamed"] = True
+    return response
+
+
+def test_streamed_page_broken_mid_body_is_requested_again(monkeypatch):
+    pytest.importorskip("ijson")
+    records = [{"id": str(n), "attributes": {"email": f"{n}@example.com"}} for n in range(4)]
+    body = json.dumps({"data": records, "links": {"next": "https://a.klaviyo.com/api/profiles?page[cursor]=c2"}}).encode()
+    resent = []
+
+    def resend(self, prepared_request, context):
+        resent.append(prepared_request.url)
+        return _streamed_page(body)
+
+    monkeypatch.setattr(ContactsStream, "_resend", resend)
+    monkeypatch.setattr(ContactsStream, "request_decorator", lambda self, func: func)
+    stream = object.__new__(ContactsStream)
+    stream._config = {"checkpoint_pages": False}
+    stream.logger = logging.getLogger("tap-klaviyo-tests")
+    response = _streamed_page(body, limit=body.index(b'{"id": "2"'))
+
+    assert [record["id"] for record in stream.parse_response(response)] == ["0", "1", "2", "3"]
+    # the same page is requested again, at the same page size
+    assert resent == ["https://a.klaviyo.com/api/profiles?page[size]=100"]
+    assert stream.page_size_controller.size == 50
+    assert stream.get_next_page_token(response, None) == "c2"
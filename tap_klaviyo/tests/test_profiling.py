@@ -0,0 +1,58 @@
+"""Tests for opt-in stream profiling."""
+
+import json
+import pstats
+import threading
+
+from tap_klaviyo.profiling import ENV_DIR, ENV_STREAMS, StreamProfiler
+
+
+def _parent_work():
+    return sum(range(1000))
+
+
+def _child_work():
+    return sum(range(1000))
+
+
+def _functions(path):
+    return {name for _, _, name in pstats.Stats(str(path)).stats}
+
+
+def test_streams_are_selected_by_pattern_and_sampled_once(monkeypatch):
+    draws = iter([0.2, 0.9])
+    profiler = StreamProfiler("/tmp/profiles", ["events_*"], sample_rate=0.5, rng=lambda: next(draws))
+
+    assert profiler.is_profiled("events_opened_email")
+    assert profiler.is_profiled("events_opened_email")
+    assert not profiler.is_profiled("events_clicked_email")
+    assert not profiler.is_profiled("contacts")
+    assert not StreamProfiler(None).is_profiled("contacts")
+
+    monkeypatch.setenv(ENV_DIR, "/tmp/env-profiles")
+    monkeypatch.setenv(ENV_STREAMS, "contacts, lists")
+    from_env = StreamProfiler.from_config({})
+    assert (from_env.directory, from_env.patterns) == ("/tmp/env-profiles", ["contacts", "lists"])
+    assert StreamProfiler.from_config({"profile_dir": "/tmp/cfg"}).directory == "/tmp/cfg"
+
+
+def test_nested_and_threaded_work_is_profiled_per_stream(tmp_path):
+    profiler = StreamProfiler(str(tmp_path))
+
+    with profiler.profile("lists"):
+        _parent_work()
+        with profiler.profile("list_members"):
+            _child_work()
+        thread = threading.Thread(target=profiler.wrap("list_members", _child_work))
+        thread.start()
+        thread.join()
+    profiler.dump(["lists", "list_members"])
+
+    assert "_parent_work" in _functions(tmp_path / "lists.prof")
+    assert "_child_work" not in _functions(tmp_path / "lists.prof")
+    child_stats = pstats.Stats(str(tmp_path / "list_members.prof")).stats
+    assert [calls for (_, _, name), (calls, *_) in child_stats.items() if name == "_child_work"] == [2]
+    memory = json.loads((tmp_path / "lists.memory.json").read_text())
+    assert memory["peak_traced_bytes"] > 0
+    assert memory["top_allocations"]
+    assert "top_allocations" not in json.loads((tmp_path / "list_members.memory.json").read_text())
@@ -0,0 +1,98 @@
+"""Tests for the proactive rate-limit scheduler."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from tap_klaviyo.rate_limit import (
+    RateLimiter,
+    expo_unless_throttled,
+    parse_rate_limit_policies,
+)
+from tap_klaviyo.streams import ListMembersStream
+
+
+class FakeClock:
+    """Deterministic clock whose sleep advances time."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def _response(status_code=200, **headers):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = {k.replace("_", "-"): v for k, v in headers.items()}
+    return response
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def limiter(clock):
+    return RateLimiter(headroom=1.0, clock=clock, sleep=clock.sleep)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("10, 10;w=1, 150;w=60", [(10, 1.0), (150, 60.0)]),
+    ("3", [(3, 1.0)]),
+    (None, []),
+    ("garbage", []),
+])
+def test_parse_rate_limit_policies(value, expected):
+    assert parse_rate_limit_policies(value) == expected
+
+
+def test_requests_are_paced_after_burst(limiter, clock):
+    """Once the burst is used up, requests are spaced at the steady rate."""
+    limiter.update("GET /events", _response(RateLimit_Limit="2, 2;w=1"))
+    for _ in range(4):
+        limiter.acquire("GET /events")
+
+    assert clock.slept == pytest.approx([0.5, 0.5])
+
+
+def test_endpoints_are_paced_independently(limiter, clock):
+    """A busy endpoint does not slow down another one."""
+    limiter.update("GET /events", _response(RateLimit_Limit="1, 1;w=1"))
+    limiter.acquire("GET /events")
+    limiter.acquire("GET /profiles")
+
+    assert clock.slept == []
+
+
+def test_retry_after_blocks_endpoint_and_skips_backoff(limiter, clock):
+    """A 429 blocks the endpoint for Retry-After and the backoff delay is skipped."""
+    limiter.update("GET /events", _response(429, Retry_After="7"))
+    waits = expo_unless_throttled(limiter, factor=5)
+
+    assert next(waits) == 0
+    limiter.acquire("GET /events")
+    assert clock.slept == [7.0]
+    # without a pending Retry-After, regular exponential backoff applies
+    assert next(waits) == 10
+
+
+def test_exhausted_quota_waits_for_reset(limiter, clock):
+    limiter.update("GET /events", _response(RateLimit_Remaining="0", RateLimit_Reset="3"))
+    limiter.acquire("GET /events")
+
+    assert clock.slept == [3.0]
+
+
+def test_discovery_requests_are_paced_on_the_sync_path_template():
+    stream = object.__new__(ListMembersStream)
+
+    assert stream._endpoint_path("https://a.klaviyo.com/api/lists/L1/profiles?page[size]=100") == "/lists/{id}/profiles"
+    assert stream._endpoint_path("https://a.klaviyo.com/api/lists") == "/lists"
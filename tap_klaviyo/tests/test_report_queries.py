@@ -0,0 +1,115 @@
+"""Tests for metric aggregates queries shared across report streams."""
+
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import requests
+
+from tap_klaviyo.profiling import StreamProfiler
+from tap_klaviyo.report_queries import ReportQueryPlan, query_key
+
+
+def _payload(measurements=("count",), start="2024-01-01T00:00:00Z", cursor=None):
+    attributes = {
+        "metric_id": "opened",
+        "measurements": list(measurements),
+        "interval": "day",
+        "filter": [f"greater-or-equal(datetime,{start})"],
+        "by": ["Campaign Name", "$message"],
+    }
+    if cursor:
+        attributes["page_cursor"] = cursor
+    return json.dumps({"data": {"type": "metric-aggregate", "attributes": attributes}}).encode()
+
+
+def test_query_key_ignores_measurement_order():
+    assert query_key(_payload(("count", "unique"))) == query_key(_payload(("unique", "count")))
+    assert query_key(_payload()) != query_key(_payload(start="2024-02-01T00:00:00Z"))
+    assert query_key(_payload()) != query_key(_payload(cursor="abc"))
+
+
+def test_identical_report_queries_are_sent_once(create_report_stream, monkeypatch):
+    opened = create_report_stream(metric_id="opened")
+    performance = create_report_stream(metric_id="opened")
+    performance.name = "campaign_performance_daily"
+    clicked = create_report_stream(metric_id="clicked")
+    plan = ReportQueryPlan([opened, performance, clicked])
+    tap = SimpleNamespace(report_query_plan=plan)
+    for stream in (opened, performance, clicked):
+        stream._tap = tap
+
+    sent = []
+
+    def send(self, prepared_request, context):
+        sent.append(self.name)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps({"data": {"attributes": {"dates": []}}}).encode()
+        return response
+
+    monkeypatch.setattr("tap_klaviyo.client.KlaviyoStream._request", send)
+    request = SimpleNamespace(body=_payload())
+
+    first = opened._request(request, None)
+    # the body kept for the other stream is spooled to disk, not held in memory
+    assert [entry[0].content for entry in plan._responses.values()] == [b""]
+    shared = performance._request(request, None)
+    assert shared.status_code == 200
+    assert shared.json() == first.json()
+    clicked._request(request, None)
+
+    assert sent == ["test_report", "test_report"]
+    assert plan.handles(opened) and not plan.handles(clicked)
+    assert plan.requests_saved == 1
+    # every sharer has read the response, so it is no longer held
+    assert plan._responses == {}
+
+
+def test_sharing_streams_query_one_range_and_drop_rows_before_their_bookmark(
+    create_report_stream, monkeypatch
+):
+    opened = create_report_stream(metric_id="opened")
+    performance = create_report_stream(metric_id="opened")
+    performance.name = "campaign_performance_daily"
+    plan = ReportQueryPlan([opened, performance])
+    tap = SimpleNamespace(report_query_plan=plan, profiler=StreamProfiler(None))
+    bookmarks = {
+        "test_report": datetime(2024, 1, 5, tzinfo=timezone.utc),
+        "campaign_performance_daily": datetime(2024, 1, 8, tzinfo=timezone.utc),
+    }
+    for seconds, stream in enumerate((opened, performance)):
+        stream._tap = tap
+        stream._config = {}
+        # each stream resolved "now" a little apart
+        stream.end_date = datetime(2024, 1, 10, 12, 0, seconds, tzinfo=timezone.utc)
+        stream.get_starting_time = lambda context, name=stream.name: bookmarks[name]
+
+    sent = []
+
+    def send(self, prepared_request, context):
+        sent.append(self.name)
+        start = datetime(2024, 1, 5, tzinfo=timezone.utc)
+        response = requests.Response()
+        response._content = json.dumps({"data": {"attributes": {
+            "dates": [(start + timedelta(days=day)).isoformat() for day in range(6)],
+            "data": [{"dimensions": ["Welcome", "m1"], "measurements": {"count": [1] * 6}}],
+        }}}).encode()
+        return response
+
+    def get_records_for_window(self, context):
+        request = SimpleNamespace(body=json.dumps(self.prepare_request_payload(context, None)))
+        return self.parse_response(self._request(request, context))
+
+    monkeypatch.setattr("tap_klaviyo.client.KlaviyoStream._request", send)
+    monkeypatch.setattr(
+        "tap_klaviyo.streams.ReportStream._get_records_for_window", get_records_for_window, raising=False
+    )
+
+    opened_dates = [record["date"][:10] for record in opened.get_records(None)]
+    performance_dates = [record["date"][:10] for record in performance.get_records(None)]
+
+    assert sent == ["test_report"]
+    assert opened_dates == ["2024-01-05", "2024-01-06", "2024-01-07", "2024-01-08", "2024-01-09", "2024-01-10"]
+    assert performance_dates == ["2024-01-08", "2024-01-09", "2024-01-10"]
+    assert plan._responses == {}
@@ -1,6 +1,13 @@
 """Tests for stream classes."""
 
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
 import pytest
+from pendulum import parse
+
+from tap_klaviyo.profiling import StreamProfiler
 
 class TestReportStreamParseResponse:
     """Tests for ReportStream.parse_response method."""
@@ -8,7 +15,7 @@ class TestReportStreamParseResponse:
     def test_parse_response_basic(self, report_stream, mock_response, load_report_fixture):
         """Test parsing a basic response with one data point."""
         response_data = load_report_fixture("basic_response")
-        results = report_stream.parse_response(mock_response(response_data))
+        results = list(report_stream.parse_response(mock_response(response_data)))
 
         assert len(results) == 2
 
@@ -28,7 +35,7 @@ class TestReportStreamParseResponse:
     ):
         """Test parsing a response with multiple data points."""
         response_data = load_report_fixture("multiple_data_points")
-        results = report_stream.parse_response(mock_response(response_data))
+        results = list(report_stream.parse_response(mock_response(response_data)))
 
         assert len(results) == 2
         assert results[0]["Campaign Name"] == "Campaign A"
@@ -42,7 +49,7 @@ class TestReportStreamParseResponse:
         """Test parsing a response with multiple aggregation types."""
         stream = create_report_stream(aggregation_types="count,sum,unique")
         response_data = load_report_fixture("multiple_aggregations")
-        results = stream.parse_response(mock_response(response_data))
+        results = list(stream.parse_response(mock_response(response_data)))
 
         assert len(results) == 1
         assert results[0]["count"] == 100
@@ -62,7 +69,7 @@ class TestReportStreamParseResponse:
         all_empty_responses = load_report_fixture("empty_responses")
         response_data = all_empty_responses[fixture_key]
         
-        results = report_stream.parse_response(mock_response(response_data))
+        results = list(report_stream.parse_response(mock_response(response_data)))
         assert len(results) == 0
 
     def test_parse_response_missing_dimension_values(
@@ -71,7 +78,7 @@ class TestReportStreamParseResponse:
         """Test that missing dimension values are set to None."""
         stream = create_report_stream(dimensions="dim1,dim2,dim3")
         response_data = load_report_fixture("missing_dimensions")
-        results = stream.parse_response(mock_response(response_data))
+        results = list(stream.parse_response(mock_response(response_data)))
 
         assert len(results) == 1
         assert results[0]["dim1"] == "value1"
@@ -84,8 +91,114 @@ class TestReportStreamParseResponse:
         """Test that missing measurement values are set to None."""
         stream = create_report_stream(aggregation_types="count,sum")
         response_data = load_report_fixture("missing_measurements")
-        results = stream.parse_response(mock_response(response_data))
+        results = list(stream.parse_response(mock_response(response_data)))
 
         assert len(results) == 1
         assert results[0]["count"] == 100
         assert results[0]["sum"] is None
+
+    def test_parse_response_formats_each_date_once(
+        self, report_stream, mock_response, load_report_fixture, monkeypatch
+    ):
+        """Records are yielded lazily and shared dates are parsed once per page."""
+        import tap_klaviyo.streams
+
+        calls = []
+        parse_datetime = tap_klaviyo.streams.parse_datetime
+        monkeypatch.setattr(
+            tap_klaviyo.streams, "parse_datetime", lambda value: calls.append(value) or parse_datetime(value)
+        )
+        response_data = load_report_fixture("multiple_data_points")
+        results = report_stream.parse_response(mock_response(response_data))
+
+        assert not isinstance(results, list)
+        records = list(results)
+        assert len(records) > len(calls)
+        assert len(calls) == len(response_data["data"]["attributes"]["dates"])
+
+
+class TestReportStreamWindows:
+    """Tests for splitting report ranges into API-sized windows."""
+
+    @pytest.fixture
+    def windowed_stream(self, report_stream):
+        report_stream._config = {"report_max_workers": 3}
+        report_stream._tap = SimpleNamespace(profiler=StreamProfiler(None), report_query_plan=None)
+        report_stream.end_date = datetime(2024, 3, 10, 12, 30, tzinfo=timezone.utc)
+        report_stream.get_starting_time = lambda context: (
+            context["window_start"] if context and "window_start" in context
+            else datetime(2021, 1, 5, tzinfo=timezone.utc)
+        )
+        return report_stream
+
+    def test_windows_cover_the_range_within_the_api_limit(self, windowed_stream):
+        windows = windowed_stream.get_report_windows(None)
+
+        assert windows[0]["window_start"] == datetime(2021, 1, 5, tzinfo=timezone.utc)
+        assert windows[-1]["window_end"] == windowed_stream.end_date
+        for previous, window in zip(windows, windows[1:]):
+            assert previous["window_end"] == window["window_start"]
+            assert window["window_start"].hour == 0
+        assert all(w["window_end"] - w["window_start"] <= timedelta(days=365) for w in windows)
+        assert len(windows) == 4
+
+    def test_windows_accept_a_pendulum_bookmark(self, windowed_stream):
+        windowed_stream.get_starting_time = lambda context: parse("2022-06-01T00:00:00+00:00")
+
+        windows = windowed_stream.get_report_windows(None)
+
+        assert [w["window_start"].date().isoformat() for w in windows] == ["2022-06-01", "2023-06-01"]
+
+    def test_month_windows_end_on_month_boundaries(self, windowed_stream):
+        windowed_stream.interval = "month"
+        windows = windowed_stream.get_report_windows(None)
+
+        assert all(w["window_start"].day == 1 for w in windows[1:])
+        assert all(w["window_end"] - w["window_start"] <= timedelta(days=365) for w in windows)
+
+    def test_payload_filters_on_the_window(self, windowed_stream):
+        window = windowed_stream.get_report_windows(None)[1]
+        payload = windowed_stream.prepare_request_payload(window, None)
+
+        assert payload["data"]["attributes"]["filter"] == [
+            "greater-or-equal(datetime,2022-01-05T00:00:00Z)",
+            "less-than(datetime,2023-01-05T00:00:00Z)",
+        ]
+
+    def test_windows_are_fetched_concurrently_and_emitted_in_date_order(self, windowed_stream):
+        events = []
+
+        def get_records_for_window(context):
+            year = context["window_start"].year
+            # earlier windows finish last
+            time.sleep(0.02 * (2025 - year))
+            yield {"date": f"{year}"}
+
+        windowed_stream._get_records_for_window = get_records_for_window
+        windowed_stream._write_state_message = lambda: events.append(
+            ("state", windowed_stream._emits_resumable_interim_state())
+        )
+        for record in windowed_stream.get_records(None):
+            events.append(record["date"])
+
+        assert events == [
+            "2021", ("state", True), "2022", ("state", True), "2023", ("state", True), "2024",
+        ]
+
+    def test_windows_are_fetched_one_at_a_time_by_default(self, windowed_stream):
+        windowed_stream._config = {}
+        running = []
+        overlapping = []
+
+        def get_records_for_window(context):
+            running.append(context["window_start"])
+            overlapping.append(len(running))
+            time.sleep(0.01)
+            running.remove(context["window_start"])
+            yield {"date": str(context["window_start"].year)}
+
+        windowed_stream._get_records_for_window = get_records_for_window
+        windowed_stream._write_state_message = lambda: None
+
+        assert [r["date"] for r in windowed_stream.get_records(None)] == ["2021", "2022", "2023", "2024"]
+        assert max(overlapping) == 1
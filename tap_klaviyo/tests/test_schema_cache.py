@@ -0,0 +1,71 @@
+"""Tests for the persistent discovery schema cache."""
+
+import pytest
+
+from tap_klaviyo.schema_cache import SchemaCache, account_key
+
+SCHEMA = {"type": "object", "properties": {"id": {"type": ["string", "null"]}}}
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "cache" / "schemas.json")
+
+
+def test_cache_round_trips_through_disk(cache_path, clock):
+    cache = SchemaCache(cache_path, account="acct", clock=clock)
+    cache.put("contacts", "2024-10-15", SCHEMA)
+    cache.save()
+
+    reloaded = SchemaCache(cache_path, account="acct", clock=clock)
+    assert reloaded.get("contacts", "2024-10-15") == SCHEMA
+
+
+def test_cache_is_keyed_by_account_and_revision(cache_path, clock):
+    cache = SchemaCache(cache_path, account="acct", clock=clock)
+    cache.put("contacts", "2024-10-15", SCHEMA)
+    cache.save()
+
+    assert cache.get("contacts", "2025-01-15") is None
+    assert SchemaCache(cache_path, account="other", clock=clock).get("contacts", "2024-10-15") is None
+
+
+def test_expired_entries_are_resampled_unless_incremental(cache_path, clock):
+    cache = SchemaCache(cache_path, account="acct", ttl=60, clock=clock)
+    cache.put("contacts", "2024-10-15", SCHEMA)
+    clock.now += 61
+
+    assert cache.get("contacts", "2024-10-15") is None
+    cache.incremental = True
+    assert cache.get("contacts", "2024-10-15") == SCHEMA
+
+
+def test_unreadable_cache_is_ignored(cache_path, clock, tmp_path):
+    (tmp_path / "cache").mkdir()
+    (tmp_path / "cache" / "schemas.json").write_text("{not json")
+    assert SchemaCache(cache_path, account="acct", clock=clock).get("contacts", "2024-10-15") is None
+
+
+def test_account_key_does_not_leak_credentials():
+    key = account_key({"api_key": "pk_secret"})
+    assert "pk_secret" not in key
+    assert account_key({"account_id": "ABC123", "api_key": "pk_secret"}) == "ABC123"
+
+
+def test_oauth_accounts_are_only_keyed_by_account_id():
+    oauth = {"client_id": "app", "client_secret": "secret", "refresh_token": "token"}
+    assert account_key(oauth) is None
+    assert account_key(dict(oauth, account_id="ABC123")) == "ABC123"
@@ -0,0 +1,35 @@
+"""Tests for the process-wide pooled HTTP session."""
+
+import requests
+from hotglue_singer_sdk.streams import Stream
+
+from tap_klaviyo.session import get_session
+from tap_klaviyo.streams import ListsStream
+
+
+def test_same_pool_settings_share_a_session():
+    assert get_session({"http_pool_size": 7}) is get_session({"http_pool_size": 7, "start_date": "2024-01-01"})
+
+
+def test_changed_pool_settings_get_their_own_session():
+    small = get_session({"http_pool_size": 3})
+    large = get_session({"http_pool_size": 30})
+    closing = get_session({"http_pool_size": 3, "http_keep_alive": False})
+
+    assert len({id(small), id(large), id(closing)}) == 3
+    assert large.get_adapter("https://a.klaviyo.com")._pool_maxsize == 30
+    assert closing.headers["Connection"] == "close"
+
+
+def test_streams_do_not_build_their_own_session(monkeypatch):
+    def fail():
+        raise AssertionError("per-stream session created")
+
+    shared = get_session({"http_pool_size": 3})
+    monkeypatch.setattr(Stream, "__init__", lambda self, **kwargs: None)
+    monkeypatch.setattr(requests, "Session", fail)
+    stream = ListsStream(tap=None)
+    stream._config = {"http_pool_size": 3}
+
+    assert stream._requests_session is None
+    assert stream.requests_session is shared
@@ -0,0 +1,69 @@
+"""Tests for TapKlaviyo discovery helpers."""
+
+import threading
+import time
+
+import pytest
+
+from tap_klaviyo.exceptions import MissingPermissionsError
+from tap_klaviyo.tap import TapKlaviyo
+
+
+@pytest.fixture
+def create_tap():
+    """Factory for TapKlaviyo instances that skip config validation and discovery."""
+    def _create(config=None):
+        tap = TapKlaviyo.__new__(TapKlaviyo)
+        tap._config = dict(config or {})
+        return tap
+    return _create
+
+
+class TestBuildStreams:
+    """Tests for TapKlaviyo._build_streams."""
+
+    @pytest.mark.parametrize("workers", [1, 4])
+    def test_build_streams_keeps_order(self, create_tap, workers):
+        """Streams come back in factory order regardless of completion order."""
+        tap = create_tap({"discovery_max_workers": workers})
+
+        def factory(index):
+            def build():
+                time.sleep(0.01 * (5 - index))
+                return index
+            return build
+
+        assert tap._build_streams([factory(i) for i in range(5)]) == [0, 1, 2, 3, 4]
+
+    def test_build_streams_runs_concurrently(self, create_tap):
+        """With several workers, factories overlap instead of running one by one."""
+        tap = create_tap({"discovery_max_workers": 3})
+        barrier = threading.Barrier(3, timeout=5)
+
+        def build():
+            barrier.wait()
+            return True
+
+        assert tap._build_streams([build, build, build]) == [True, True, True]
+
+    def test_stream_factory_skips_missing_permissions(self, create_tap):
+        """A stream without permissions is skipped instead of failing discovery."""
+        tap = create_tap({"discovery_max_workers": 2})
+
+        class ForbiddenStream:
+            def __init__(self, tap):
+                raise MissingPermissionsError("permission_denied")
+
+        assert tap._build_streams([tap._stream_factory(ForbiddenStream)]) == [None]
+
+
+class TestMetricNameToId:
+    """Tests for TapKlaviyo.metric_name_to_id."""
+
+    def test_metrics_passed_by_callers_are_searched(self, create_tap):
+        tap = create_tap()
+        metrics = [{"id": "m1", "attributes": {"name": "Opened Email"}}]
+
+        assert tap.metric_name_to_id(metrics, "openedemail") == "m1"
+        with pytest.raises(ValueError):
+            tap.metric_name_to_id(metrics, "Clicked Email")
@@ -0,0 +1,58 @@
+"""Tests for per-stream telemetry."""
+
+import json
+from types import SimpleNamespace
+
+from tap_klaviyo.profiling import StreamProfiler
+from tap_klaviyo.streams import ListMembersStream, ListsStream
+from tap_klaviyo.telemetry import StreamTelemetry, Telemetry, percentile
+
+
+def test_summary_reports_latency_percentiles_and_counters():
+    telemetry = StreamTelemetry("events")
+    for elapsed in range(1, 101):
+        telemetry.record_request(elapsed / 100, 10)
+    telemetry.record_retry(2.5)
+    telemetry.record_rate_limit_wait(0.0)
+    telemetry.record_rate_limit_wait(1.5)
+    telemetry.record_post_process(0.25)
+
+    summary = telemetry.summary()
+
+    assert summary["requests"] == 100
+    assert summary["latency_p50_seconds"] == 0.5
+    assert summary["latency_p99_seconds"] == 0.99
+    assert summary["latency_max_seconds"] == 1.0
+    assert summary["bytes"] == 1000
+    assert (summary["retries"], summary["backoff_seconds"]) == (1, 2.5)
+    assert summary["rate_limited_seconds"] == 1.5
+    assert (summary["records"], summary["post_process_seconds"]) == (1, 0.25)
+    assert percentile([], 0.5) == 0.0
+
+
+def test_metric_lines_and_summary_file_cover_child_streams(tmp_path):
+    path = tmp_path / "metrics.json"
+    tap = SimpleNamespace(telemetry=Telemetry(), profiler=StreamProfiler(None))
+    lists = object.__new__(ListsStream)
+    members = object.__new__(ListMembersStream)
+    for stream in (lists, members):
+        stream._tap = tap
+        stream._tap_state = {}
+        stream._state_partitioning_keys = None
+        stream._config = {"metrics_summary_path": str(path)}
+    lists.child_streams = [members]
+    members.child_streams = []
+    lists.telemetry.record_request(0.2, 100)
+    members.telemetry.record_post_process(0.01)
+    logged = []
+    lists._write_metric_log = lambda metric, tags: logged.append(metric)
+
+    # the tap finalizes each top-level stream once it and its children have synced
+    lists.finalize_state_progress_markers()
+
+    requests = {m["tags"]["stream"]: m["value"] for m in logged if m["metric"] == "requests"}
+    assert requests == {"lists": 1, "list_members": 0}
+    assert {m["type"] for m in logged if m["metric"] == "latency_p50_seconds"} == {"timer"}
+    summary = json.loads(path.read_text())
+    assert summary["lists"]["bytes"] == 100
+    assert summary["list_members"]["records"] == 1
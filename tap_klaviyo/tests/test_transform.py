@@ -0,0 +1,54 @@
+"""Tests for the compiled per-stream record transformer."""
+
+import pytest
+from pendulum import parse
+
+from tap_klaviyo.transform import DATETIME_FORMAT, RecordTransformer
+
+SCHEMA = {
+    "properties": {
+        "id": {"type": ["string", "null"]},
+        "email": {"type": ["string", "null"]},
+        "created": {"type": ["string", "null"], "format": "date-time"},
+        "updated": {"type": ["string", "null"], "format": "date-time"},
+    }
+}
+
+
+@pytest.mark.parametrize("value", [
+    "2024-01-01T10:00:00+00:00",
+    "2024-01-01T10:00:00Z",
+    "2024-01-01T10:00:00.123456+00:00",
+    "2024-01-01T10:00:00.123Z",
+    "2024-01-01T10:00:00+02:00",
+    "2024-01-01 10:00:00",
+    "2024-01-01",
+])
+def test_datetime_format_matches_pendulum(value):
+    """The fast parser produces exactly what the pendulum-based post_process did."""
+    transformer = RecordTransformer(SCHEMA)
+    assert transformer.format_datetime(value) == parse(value).strftime(DATETIME_FORMAT)
+
+
+def test_flattens_attributes_and_formats_dates_in_place():
+    transformer = RecordTransformer(SCHEMA)
+    row = {
+        "id": "p1",
+        "attributes": {"email": "a@b.c", "created": "2024-01-01T00:00:00+00:00", "updated": None},
+    }
+    result = transformer(row)
+
+    assert result is row
+    assert result == {
+        "id": "p1",
+        "email": "a@b.c",
+        "created": "2024-01-01T00:00:00.000000Z",
+        "updated": None,
+    }
+
+
+def test_memo_is_bounded():
+    transformer = RecordTransformer(SCHEMA, memo_size=2)
+    for day in range(1, 6):
+        transformer.format_datetime(f"2024-01-0{day}T00:00:00Z")
+    assert len(transformer._memo) <= 2
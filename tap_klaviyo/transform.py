@@ -0,0 +1,62 @@
+"""Per-stream record transformer compiled once from the stream schema."""
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from pendulum import parse
+
+DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+DEFAULT_MEMO_SIZE = 8192
+
+
+def parse_datetime(value: str) -> datetime:
+    """Parse an ISO-8601 timestamp, falling back to pendulum for other formats."""
+    try:
+        if value.endswith("Z"):
+            value = value[:-1] + "+00:00"
+        return datetime.fromisoformat(value)
+    except (ValueError, TypeError, AttributeError):
+        return parse(value)
+
+
+class RecordTransformer:
+    """Flatten `attributes` into the record and normalize its date-time properties.
+
+    The date-time keys are read from the schema once, and formatted timestamps are
+    memoized because pages often repeat the same values (e.g. `created`/`updated`).
+    """
+
+    def __init__(self, schema: dict, memo_size: int = DEFAULT_MEMO_SIZE):
+        self.datetime_keys = tuple(
+            key
+            for key, value in schema.get("properties", {}).items()
+            if value.get("format") == "date-time"
+        )
+        self.memo_size = memo_size
+        self._memo: Dict[Any, str] = {}
+
+    def format_datetime(self, value: Any) -> str:
+        formatted = self._memo.get(value)
+        if formatted is None:
+            formatted = parse_datetime(value).strftime(DATETIME_FORMAT)
+            if len(self._memo) >= self.memo_size:
+                self._memo.clear()
+            self._memo[value] = formatted
+        return formatted
+
+    def __call__(self, row: dict, selected_attributes: Optional[Iterable[str]] = None) -> dict:
+        """Transform `row` in place and return it."""
+        attributes = row.pop("attributes", None)
+        if attributes:
+            if selected_attributes is None:
+                row.update(attributes)
+            else:
+                # drop unselected attributes before they are copied and parsed
+                for key in selected_attributes:
+                    if key in attributes:
+                        row[key] = attributes[key]
+        for key in self.datetime_keys:
+            value = row.get(key)
+            if value is not None:
+                row[key] = self.format_datetime(value)
+        return row